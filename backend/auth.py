@@ -9,6 +9,8 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from models import UserInDB, UserPublic
 from db import get_db
+from hashing import get_hashing_executor
+from cache import TTLCache, env_cache
 import os
 
 
@@ -20,6 +22,9 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Authenticated users keyed by token ``sub``; entries are dropped on user writes.
+user_cache: TTLCache[UserInDB] = env_cache("USER_CACHE", default_entries=10000, default_ttl=60)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -29,6 +34,14 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await get_hashing_executor().run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await get_hashing_executor().run(get_password_hash, password)
+
+
 async def get_user_by_email(db: AsyncIOMotorDatabase, email: str) -> Optional[UserInDB]:
     doc = await db.users.find_one({"email": email})
     if not doc:
@@ -43,6 +56,10 @@ async def get_user_by_id(db: AsyncIOMotorDatabase, user_id: str) -> Optional[Use
     return UserInDB(**doc)
 
 
+def invalidate_cached_user(user_id: str) -> None:
+    user_cache.invalidate(user_id)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -64,9 +81,12 @@ async def get_current_user(db: AsyncIOMotorDatabase = Depends(get_db), token: st
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = await get_user_by_id(db, user_id)
+    user = user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        user = await get_user_by_id(db, user_id)
+        if user is None:
+            raise credentials_exception
+        user_cache.set(user_id, user)
     return user
 
 
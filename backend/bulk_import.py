@@ -0,0 +1,261 @@
+"""Bulk property inserts and status/price updates for ``POST /api/properties/bulk``.
+
+The body is a JSON array, NDJSON (``application/x-ndjson``) or CSV
+(``text/csv``, header row required). NDJSON and CSV are parsed as they
+stream in. Rows are validated individually and written in chunks: inserts
+with one ``bulk_write``, updates with one ``find_one_and_update`` per row so
+each dashboard stats transition uses the document's real pre-image. Every
+row read gets an entry in the report. In ordered mode reading stops at the
+first failure, and rows after it (like rows past ``PROPERTY_BULK_MAX_ROWS``)
+are not reported; ``aborted`` is set instead.
+"""
+from __future__ import annotations
+
+import asyncio
+import codecs
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional, Union
+
+from fastapi import HTTPException, Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel, ValidationError
+from pymongo import InsertOne, ReturnDocument
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from dashboard_stats import record_properties_changed, record_properties_created
+from models import (
+    BulkPropertyReport,
+    BulkRowResult,
+    PropertyBulkUpdate,
+    PropertyCreate,
+    PropertyInDB,
+)
+from property_writes import after_property_writes
+
+
+BULK_CHUNK_SIZE = int(os.environ.get("PROPERTY_BULK_CHUNK_SIZE", 500))
+BULK_MAX_ROWS = int(os.environ.get("PROPERTY_BULK_MAX_ROWS", 10000))
+
+Row = Union[dict, str]  # parsed row, or a parse error message
+
+
+async def _lines(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _ndjson_rows(request: Request) -> AsyncIterator[Row]:
+    async for line in _lines(request):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield f"Invalid JSON: {e}"
+            continue
+        yield row if isinstance(row, dict) else "Each line must be a JSON object"
+
+
+async def _csv_rows(request: Request) -> AsyncIterator[Row]:
+    header: Optional[list[str]] = None
+    record = ""
+    async for line in _lines(request):
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue  # quoted field spans lines
+        values = next(csv.reader([record.rstrip("\r")]), [])
+        record = ""
+        if not any(v.strip() for v in values):
+            continue
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        if len(values) != len(header):
+            yield f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty cells mean "not provided" so model defaults apply
+        yield {k: v for k, v in zip(header, values) if v != ""}
+
+
+async def _json_rows(request: Request) -> AsyncIterator[Row]:
+    try:
+        payload = json.loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}") from e
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="JSON body must be an array of rows")
+    for row in payload:
+        yield row if isinstance(row, dict) else "Each row must be a JSON object"
+
+
+def iter_rows(request: Request) -> AsyncIterator[Row]:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "text/csv":
+        return _csv_rows(request)
+    if content_type in {"application/x-ndjson", "application/ndjson", "application/jsonl"}:
+        return _ndjson_rows(request)
+    return _json_rows(request)
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+
+
+class _BulkRun(ABC):
+    def __init__(self, ordered: bool) -> None:
+        self.ordered = ordered
+        self.report = BulkPropertyReport()
+
+    def add(self, row: int, status: str, id: Optional[str] = None, error: Optional[str] = None) -> None:
+        self.report.results.append(BulkRowResult(row=row, status=status, id=id, error=error))
+        if status == "inserted":
+            self.report.inserted += 1
+        elif status == "updated":
+            self.report.updated += 1
+        elif status in {"error", "not_found"}:
+            self.report.failed += 1
+
+    def stop_on_failure(self) -> bool:
+        """Record a failure; in ordered mode the run stops here."""
+        if self.ordered:
+            self.report.aborted = True
+        return self.ordered
+
+    async def run(self, rows: AsyncIterator[Row], model: type[BaseModel]) -> BulkPropertyReport:
+        chunk: list[tuple[int, BaseModel]] = []
+        row_no = 0
+        async for raw in rows:
+            row_no += 1
+            if row_no > BULK_MAX_ROWS:
+                self.add(row_no, "error", error=f"Row limit of {BULK_MAX_ROWS} per request exceeded")
+                self.report.aborted = True
+                break
+            try:
+                if isinstance(raw, str):
+                    raise ValueError(raw)
+                chunk.append((row_no, model(**raw)))
+            except (ValidationError, ValueError) as e:
+                message = _validation_message(e) if isinstance(e, ValidationError) else str(e)
+                self.add(row_no, "error", error=message)
+                if self.stop_on_failure():
+                    break
+                continue
+            if len(chunk) >= BULK_CHUNK_SIZE:
+                ok = await self.flush(chunk)
+                chunk = []
+                if not ok and self.ordered:
+                    break
+        if chunk:
+            await self.flush(chunk)
+        # Rows rejected during parsing are reported immediately, written rows only when their chunk is flushed
+        self.report.results.sort(key=lambda result: result.row)
+        return self.report
+
+    @abstractmethod
+    async def flush(self, chunk: list) -> bool:
+        """Write ``chunk`` and report each of its rows; False if the run should stop."""
+
+
+def _write_errors(error: BulkWriteError) -> dict[int, str]:
+    return {e["index"]: e.get("errmsg", "write error") for e in error.details.get("writeErrors", [])}
+
+
+class BulkInsert(_BulkRun):
+    def __init__(self, database: AsyncIOMotorDatabase, franchise_id: str, ordered: bool) -> None:
+        super().__init__(ordered)
+        self.database = database
+        self.franchise_id = franchise_id
+
+    async def flush(self, chunk: list[tuple[int, PropertyCreate]]) -> bool:
+        docs = [PropertyInDB(**row.model_dump(), franchise_id=self.franchise_id).model_dump() for _, row in chunk]
+        errors: dict[int, str] = {}
+        try:
+            await self.database.properties.bulk_write([InsertOne(dict(doc)) for doc in docs], ordered=self.ordered)
+        except BulkWriteError as e:
+            errors = _write_errors(e)
+
+        first_error = min(errors, default=None)
+        inserted = []
+        for i, ((row_no, _), doc) in enumerate(zip(chunk, docs)):
+            if i in errors:
+                self.add(row_no, "error", error=errors[i])
+            elif self.ordered and first_error is not None and i > first_error:
+                self.add(row_no, "skipped")
+            else:
+                self.add(row_no, "inserted", id=doc["id"])
+                inserted.append(doc)
+
+        await record_properties_created(self.database, inserted)
+        await after_property_writes(self.database, [(doc["id"], doc, None) for doc in inserted])
+        if errors:
+            return not self.stop_on_failure()
+        return True
+
+
+class BulkUpdate(_BulkRun):
+    def __init__(self, database: AsyncIOMotorDatabase, scope: dict, ordered: bool) -> None:
+        super().__init__(ordered)
+        self.database = database
+        self.scope = scope
+
+    async def _update(self, row: PropertyBulkUpdate, now: datetime) -> tuple[str, Optional[str], Optional[tuple]]:
+        """``(status, error, (before, changes))`` for one row; the pre-image comes from the write itself."""
+        changes = row.model_dump(exclude={"id"}, exclude_none=True)
+        if not changes:
+            return "error", "Nothing to update; provide status and/or price", None
+        changes["updated_at"] = now
+        try:
+            before = await self.database.properties.find_one_and_update(
+                {"id": row.id, **self.scope},
+                {"$set": changes},
+                projection={"_id": 0},
+                return_document=ReturnDocument.BEFORE,
+            )
+        except PyMongoError as e:
+            return "error", str(e), None
+        if before is None:
+            return "not_found", "Property not found or not editable", None
+        return "updated", None, (before, changes)
+
+    async def flush(self, chunk: list[tuple[int, PropertyBulkUpdate]]) -> bool:
+        now = datetime.now(timezone.utc)
+        if self.ordered:
+            outcomes = []
+            for row_no, row in chunk:
+                outcomes.append(await self._update(row, now))
+                if outcomes[-1][0] != "updated":
+                    break
+        else:
+            outcomes = await asyncio.gather(*(self._update(row, now) for _, row in chunk))
+
+        applied = []
+        ok = True
+        for (row_no, row), outcome in zip(chunk, outcomes):
+            status, error, change = outcome
+            self.add(row_no, status, id=row.id, error=error)
+            if change is not None:
+                applied.append(change)
+            elif self.stop_on_failure():
+                ok = False
+        for row_no, row in chunk[len(outcomes):]:
+            self.add(row_no, "skipped", id=row.id)
+
+        await record_properties_changed(self.database, applied)
+        await after_property_writes(
+            self.database,
+            [(before["id"], {**before, **changes}, before) for before, changes in applied],
+            cities_changed=False,
+        )
+        return ok
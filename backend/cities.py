@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from cache import TTLCache, env_cache
+from models import normalize_city
+
+
+# Single entry: every (city_key, display name) pair, sorted by key.
+_city_cache: TTLCache[list] = env_cache("CITY_SUGGESTIONS", default_entries=1, default_ttl=300)
+
+
+async def _load_cities(database: AsyncIOMotorDatabase) -> list[tuple[str, str]]:
+    cities = _city_cache.get("all")
+    if cities is None:
+        rows = await database.properties.aggregate(
+            [
+                {"$group": {"_id": "$city_key", "city": {"$first": "$city"}}},
+                {"$sort": {"_id": 1}},
+            ]
+        ).to_list(None)
+        cities = [(row["_id"], row["city"]) for row in rows if row["_id"]]
+        _city_cache.set("all", cities)
+    return cities
+
+
+async def suggest_cities(database: AsyncIOMotorDatabase, prefix: str = "", limit: int = 10) -> list[str]:
+    key = normalize_city(prefix)
+    cities = await _load_cities(database)
+    return [name for city_key, name in cities if city_key.startswith(key)][:limit]
+
+
+def invalidate_city_suggestions() -> None:
+    _city_cache.clear()
+
+
+def city_cache_stats() -> dict:
+    return _city_cache.stats()
@@ -0,0 +1,343 @@
+"""Dashboard counters.
+
+Counters are computed with server-side aggregations and, for franchises and
+agents, kept in the ``franchise_stats`` / ``agent_stats`` collections which
+write paths update with an upserting ``$inc``. Reads never create them,
+since a seed computed from an aggregation can race with a concurrent write
+and count it twice or not at all. Until a full rebuild has completed (the
+``backfill_dashboard_stats`` migration, or ``python dashboard_stats.py
+--rebuild``, which also repairs drift) a hook may have created a partial
+document, so reads use the aggregation until the rebuild's completion
+marker exists. A key without a document is answered from the aggregation.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+
+
+PROPERTY_STATUSES = ("available", "booked", "sold")
+
+_COMPLETED_BOOKING = {"$and": [{"$eq": ["$type", "booking"]}, {"$eq": ["$status", "completed"]}]}
+
+
+def _leads_facet(match: dict, limit: int, projection: Optional[dict] = None) -> list[dict]:
+    """Counters plus the most recent ``limit`` leads in a single round trip."""
+    return [
+        {"$match": match},
+        {
+            "$facet": {
+                "totals": [
+                    {
+                        "$group": {
+                            "_id": None,
+                            "total_leads": {"$sum": 1},
+                            "completed_bookings": {"$sum": {"$cond": [_COMPLETED_BOOKING, 1, 0]}},
+                            "total_booking_amount": {
+                                "$sum": {"$cond": [_COMPLETED_BOOKING, {"$ifNull": ["$amount", 0]}, 0]}
+                            },
+                        }
+                    }
+                ],
+                "leads": [
+                    {"$sort": {"created_at": -1}},
+                    {"$limit": limit},
+                    {"$project": projection or {"_id": 0}},
+                ],
+            }
+        },
+    ]
+
+
+async def _lead_summary(
+    database: AsyncIOMotorDatabase, match: dict, limit: int, projection: Optional[dict] = None
+) -> tuple[dict, list[dict]]:
+    result = await database.leads.aggregate(_leads_facet(match, limit, projection)).to_list(1)
+    facet = result[0] if result else {"totals": [], "leads": []}
+    totals = facet["totals"][0] if facet["totals"] else {}
+    counters = {
+        "total_leads": int(totals.get("total_leads", 0)),
+        "completed_bookings": int(totals.get("completed_bookings", 0)),
+        "total_booking_amount": float(totals.get("total_booking_amount", 0) or 0),
+    }
+    return counters, facet["leads"]
+
+
+async def _property_status_counts(database: AsyncIOMotorDatabase, match: dict) -> dict:
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+    ]
+    rows = await database.properties.aggregate(pipeline).to_list(len(PROPERTY_STATUSES) + 1)
+    by_status = {row["_id"]: int(row["count"]) for row in rows}
+    counts = {f"{s}_properties": by_status.get(s, 0) for s in PROPERTY_STATUSES}
+    counts["total_properties"] = sum(by_status.values())
+    return counts
+
+
+async def aggregate_franchise_dashboard(
+    database: AsyncIOMotorDatabase, franchise_id: str, recent_limit: int = 10, lead_projection: Optional[dict] = None
+) -> tuple[dict, list[dict]]:
+    match = {"franchise_id": franchise_id}
+    property_counts, (lead_counters, recent_leads) = await asyncio.gather(
+        _property_status_counts(database, match),
+        _lead_summary(database, match, recent_limit, lead_projection),
+    )
+    counters = {**property_counts, "total_booking_amount": lead_counters["total_booking_amount"]}
+    return counters, recent_leads
+
+
+async def aggregate_agent_dashboard(
+    database: AsyncIOMotorDatabase, agent_id: str, lead_limit: int = 200, lead_projection: Optional[dict] = None
+) -> tuple[dict, list[dict]]:
+    match = {"assigned_agent_id": agent_id}
+    properties_count, (lead_counters, leads) = await asyncio.gather(
+        database.properties.count_documents(match),
+        _lead_summary(database, match, lead_limit, lead_projection),
+    )
+    counters = {
+        "total_leads": lead_counters["total_leads"],
+        "completed_bookings": lead_counters["completed_bookings"],
+        "properties_count": properties_count,
+    }
+    return counters, leads
+
+
+async def aggregate_customer_dashboard(
+    database: AsyncIOMotorDatabase, customer_id: str, lead_limit: int = 200, lead_projection: Optional[dict] = None
+) -> tuple[dict, list[dict]]:
+    lead_counters, leads = await _lead_summary(database, {"customer_id": customer_id}, lead_limit, lead_projection)
+    counters = {
+        "total_leads": lead_counters["total_leads"],
+        "completed_bookings": lead_counters["completed_bookings"],
+    }
+    return counters, leads
+
+
+# ---------- Materialized stats ----------
+
+FRANCHISE_COUNTERS = ("total_properties", *(f"{s}_properties" for s in PROPERTY_STATUSES), "total_booking_amount")
+AGENT_COUNTERS = ("properties_count", "total_leads", "completed_bookings")
+
+
+async def _inc(collection, key: Optional[str], deltas: dict) -> None:
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not key or not deltas:
+        return
+    await collection.update_one(
+        {"_id": key},
+        {"$inc": deltas, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
+
+class _Deltas:
+    """Per-key counter deltas, merged so a batch of writes costs one ``$inc`` per key."""
+
+    def __init__(self) -> None:
+        self.franchises: dict[str, Counter] = defaultdict(Counter)
+        self.agents: dict[str, Counter] = defaultdict(Counter)
+
+    def franchise(self, key: Optional[str], **deltas: float) -> None:
+        if key:
+            self.franchises[key].update(deltas)
+
+    def agent(self, key: Optional[str], **deltas: float) -> None:
+        if key:
+            self.agents[key].update(deltas)
+
+    async def apply(self, database: AsyncIOMotorDatabase) -> None:
+        await asyncio.gather(
+            *(_inc(database.franchise_stats, key, dict(d)) for key, d in self.franchises.items()),
+            *(_inc(database.agent_stats, key, dict(d)) for key, d in self.agents.items()),
+        )
+
+
+async def record_properties_created(database: AsyncIOMotorDatabase, props: list[dict], sign: int = 1) -> None:
+    deltas = _Deltas()
+    for prop in props:
+        deltas.franchise(prop.get("franchise_id"), **{"total_properties": sign, f"{prop['status']}_properties": sign})
+        deltas.agent(prop.get("assigned_agent_id"), properties_count=sign)
+    await deltas.apply(database)
+
+
+async def record_property_created(database: AsyncIOMotorDatabase, prop: dict) -> None:
+    await record_properties_created(database, [prop])
+
+
+async def record_property_deleted(database: AsyncIOMotorDatabase, prop: dict) -> None:
+    await record_properties_created(database, [prop], sign=-1)
+
+
+async def record_properties_changed(database: AsyncIOMotorDatabase, changes: list[tuple[dict, dict]]) -> None:
+    """Apply ``(before, changed_fields)`` pairs to the stats."""
+    deltas = _Deltas()
+    for before, changed in changes:
+        new_status = changed.get("status")
+        if new_status and new_status != before["status"]:
+            deltas.franchise(before.get("franchise_id"), **{f"{before['status']}_properties": -1, f"{new_status}_properties": 1})
+        if "assigned_agent_id" in changed and changed["assigned_agent_id"] != before.get("assigned_agent_id"):
+            deltas.agent(before.get("assigned_agent_id"), properties_count=-1)
+            deltas.agent(changed["assigned_agent_id"], properties_count=1)
+    await deltas.apply(database)
+
+
+async def record_property_changed(database: AsyncIOMotorDatabase, before: dict, changes: dict) -> None:
+    await record_properties_changed(database, [(before, changes)])
+
+
+async def record_lead_created(database: AsyncIOMotorDatabase, lead: dict) -> None:
+    await _inc(database.agent_stats, lead.get("assigned_agent_id"), {"total_leads": 1})
+
+
+async def record_bookings_completed(database: AsyncIOMotorDatabase, leads: list[dict]) -> None:
+    deltas = _Deltas()
+    for lead in leads:
+        if lead.get("type") != "booking":
+            continue
+        deltas.franchise(lead.get("franchise_id"), total_booking_amount=float(lead.get("amount") or 0))
+        deltas.agent(lead.get("assigned_agent_id"), completed_bookings=1)
+    await deltas.apply(database)
+
+
+async def record_booking_completed(database: AsyncIOMotorDatabase, lead: dict) -> None:
+    await record_bookings_completed(database, [lead])
+
+
+_MARKER_ID = "rebuild"
+_materialized_ready = False
+
+
+async def materialized_ready(database: AsyncIOMotorDatabase) -> bool:
+    """Whether a full rebuild has completed, so stats documents can be trusted."""
+    global _materialized_ready
+    if not _materialized_ready:
+        _materialized_ready = await database.dashboard_stats_meta.find_one({"_id": _MARKER_ID}) is not None
+    return _materialized_ready
+
+
+async def franchise_dashboard(
+    database: AsyncIOMotorDatabase, franchise_id: str, recent_limit: int = 10, lead_projection: Optional[dict] = None
+) -> tuple[dict, list[dict]]:
+    doc = await database.franchise_stats.find_one({"_id": franchise_id}) if await materialized_ready(database) else None
+    if doc is None:
+        return await aggregate_franchise_dashboard(database, franchise_id, recent_limit, lead_projection)
+
+    recent = await (
+        database.leads.find({"franchise_id": franchise_id}, lead_projection or {"_id": 0})
+        .sort("created_at", -1)
+        .to_list(recent_limit)
+    )
+    return {k: doc.get(k, 0) for k in FRANCHISE_COUNTERS}, recent
+
+
+async def agent_dashboard(
+    database: AsyncIOMotorDatabase, agent_id: str, lead_limit: int = 200, lead_projection: Optional[dict] = None
+) -> tuple[dict, list[dict]]:
+    doc = await database.agent_stats.find_one({"_id": agent_id}) if await materialized_ready(database) else None
+    if doc is None:
+        return await aggregate_agent_dashboard(database, agent_id, lead_limit, lead_projection)
+
+    leads = await (
+        database.leads.find({"assigned_agent_id": agent_id}, lead_projection or {"_id": 0})
+        .sort("created_at", -1)
+        .to_list(lead_limit)
+    )
+    return {k: doc.get(k, 0) for k in AGENT_COUNTERS}, leads
+
+
+async def rebuild_stats(database: AsyncIOMotorDatabase) -> dict:
+    """Recompute every franchise/agent stats document from the source collections.
+
+    Records the completion marker that lets reads use the documents.
+    """
+    franchises: dict[str, dict] = {}
+    agents: dict[str, dict] = {}
+
+    def franchise(fid: str) -> dict:
+        return franchises.setdefault(fid, {k: 0 for k in FRANCHISE_COUNTERS})
+
+    def agent(aid: str) -> dict:
+        return agents.setdefault(aid, {k: 0 for k in AGENT_COUNTERS})
+
+    async for row in database.properties.aggregate(
+        [{"$group": {"_id": {"f": "$franchise_id", "s": "$status"}, "count": {"$sum": 1}}}]
+    ):
+        fid, prop_status = row["_id"].get("f"), row["_id"].get("s")
+        if not fid:
+            continue
+        counters = franchise(fid)
+        counters["total_properties"] += row["count"]
+        if prop_status in PROPERTY_STATUSES:
+            counters[f"{prop_status}_properties"] += row["count"]
+
+    async for row in database.properties.aggregate(
+        [
+            {"$match": {"assigned_agent_id": {"$ne": None}}},
+            {"$group": {"_id": "$assigned_agent_id", "count": {"$sum": 1}}},
+        ]
+    ):
+        agent(row["_id"])["properties_count"] = row["count"]
+
+    async for row in database.leads.aggregate(
+        [
+            {"$match": {"type": "booking", "status": "completed", "franchise_id": {"$ne": None}}},
+            {"$group": {"_id": "$franchise_id", "amount": {"$sum": {"$ifNull": ["$amount", 0]}}}},
+        ]
+    ):
+        franchise(row["_id"])["total_booking_amount"] = float(row["amount"])
+
+    async for row in database.leads.aggregate(
+        [
+            {"$match": {"assigned_agent_id": {"$ne": None}}},
+            {
+                "$group": {
+                    "_id": "$assigned_agent_id",
+                    "total_leads": {"$sum": 1},
+                    "completed_bookings": {"$sum": {"$cond": [_COMPLETED_BOOKING, 1, 0]}},
+                }
+            },
+        ]
+    ):
+        counters = agent(row["_id"])
+        counters["total_leads"] = row["total_leads"]
+        counters["completed_bookings"] = row["completed_bookings"]
+
+    now = datetime.now(timezone.utc)
+    for collection, docs in ((database.franchise_stats, franchises), (database.agent_stats, agents)):
+        if docs:
+            await collection.bulk_write(
+                [ReplaceOne({"_id": key}, {**counters, "updated_at": now}, upsert=True) for key, counters in docs.items()],
+                ordered=False,
+            )
+        await collection.delete_many({"_id": {"$nin": list(docs)}})
+    await database.dashboard_stats_meta.update_one(
+        {"_id": _MARKER_ID}, {"$set": {"completed_at": now}}, upsert=True
+    )
+
+    return {"franchises": len(franchises), "agents": len(agents)}
+
+
+async def _main() -> None:
+    from db import db, close_db_client
+
+    try:
+        result = await rebuild_stats(db)
+        print(f"Rebuilt stats for {result['franchises']} franchise(s) and {result['agents']} agent(s)")
+    finally:
+        await close_db_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain materialized dashboard stats")
+    parser.add_argument("--rebuild", action="store_true", help="recompute all stats documents from source collections")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("nothing to do; pass --rebuild")
+    asyncio.run(_main())
@@ -6,12 +6,15 @@ from pathlib import Path
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
+from metrics import mongo_listeners
+from slow_queries import get_slow_query_monitor
+
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / ".env")
 
 mongo_url = os.environ["MONGO_URL"]
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[*mongo_listeners(), get_slow_query_monitor()])
 db: AsyncIOMotorDatabase = client[os.environ["DB_NAME"]]
 
 
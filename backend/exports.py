@@ -0,0 +1,118 @@
+"""Streaming NDJSON / CSV exports of ``properties`` and ``leads``.
+
+Documents are read through an async cursor in ``EXPORT_BATCH_SIZE``
+batches and each batch is encoded (and optionally gzipped) before the next
+one is fetched, so memory use does not depend on how many rows match.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Callable, Literal
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from fieldsets import FieldSet, fields_param
+from models import LeadPublic, PropertyPublic, UserInDB
+
+
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+
+ExportFormat = Literal["ndjson", "csv"]
+
+_TIMESTAMPS = ["created_at", "updated_at"]
+EXPORT_FIELDS: dict[str, list[str]] = {
+    "properties": list(PropertyPublic.model_fields) + _TIMESTAMPS,
+    "leads": list(LeadPublic.model_fields) + _TIMESTAMPS,
+}
+
+
+def export_fields(collection: str) -> Callable[..., FieldSet]:
+    """``?fields=`` dependency choosing the exported columns."""
+    return fields_param(EXPORT_FIELDS[collection])
+
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def export_scope(user: UserInDB, collection: str) -> dict:
+    """Filter limiting an export to the rows ``user`` can already see."""
+    if user.role == "super_admin":
+        return {}
+    if user.role == "franchise_owner":
+        if not user.franchise_id:
+            raise HTTPException(status_code=400, detail="User not linked to a franchise")
+        return {"franchise_id": user.franchise_id}
+    if user.role == "agent":
+        return {"assigned_agent_id": user.id}
+    if user.role == "customer" and collection == "leads":
+        return {"customer_id": user.id}
+    raise HTTPException(status_code=403, detail=f"Not allowed to export {collection}")
+
+
+def _cell(value: object) -> object:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _encode_ndjson(docs: list[dict], fields: list[str]) -> str:
+    return "".join(
+        json.dumps({f: _cell(doc.get(f)) for f in fields}, separators=(",", ":")) + "\n" for doc in docs
+    )
+
+
+def _encode_csv(docs: list[dict], fields: list[str]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for doc in docs:
+        writer.writerow(["" if doc.get(f) is None else _cell(doc.get(f)) for f in fields])
+    return buffer.getvalue()
+
+
+async def _export_chunks(
+    database: AsyncIOMotorDatabase, collection: str, query: dict, fmt: ExportFormat, gzip: bool, fields: list[str]
+) -> AsyncIterator[bytes]:
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+    compressor = zlib.compressobj(wbits=31) if gzip else None  # wbits=31: gzip container
+
+    def emit(text: str) -> bytes:
+        data = text.encode()
+        return compressor.compress(data) if compressor else data
+
+    header = ",".join(fields) + "\n" if fmt == "csv" else ""
+    cursor = database[collection].find(query, {f: 1 for f in fields} | {"_id": 0}).batch_size(EXPORT_BATCH_SIZE)
+    batch: list[dict] = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            chunk = emit(header + encode(batch, fields))
+            header, batch = "", []
+            if chunk:
+                yield chunk
+    tail = emit(header + encode(batch, fields))
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
+
+
+def export_response(
+    database: AsyncIOMotorDatabase,
+    collection: str,
+    query: dict,
+    fmt: ExportFormat,
+    gzip: bool = False,
+    fields: FieldSet = None,
+) -> StreamingResponse:
+    filename = f"{collection}.{fmt}" + (".gz" if gzip else "")
+    columns = list(fields) if fields else EXPORT_FIELDS[collection]
+    return StreamingResponse(
+        _export_chunks(database, collection, query, fmt, gzip, columns),
+        media_type="application/gzip" if gzip else _MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from pagination import KEYSET_SORT
+from search_index import get_search_index
+
+
+def _price_boundaries(raw: str) -> list[float]:
+    boundaries = sorted({float(b) for b in raw.split(",") if b.strip()})
+    if len(boundaries) < 2:
+        raise ValueError(f"PROPERTY_PRICE_BUCKETS needs at least two distinct boundaries, got {raw!r}")
+    return boundaries
+
+
+PRICE_BOUNDARIES = _price_boundaries(
+    os.environ.get("PROPERTY_PRICE_BUCKETS", "0,2500000,5000000,10000000,20000000,50000000")
+)
+
+
+def _value_counts(field: str, label: Optional[str] = None) -> list[dict]:
+    group: dict = {"_id": f"${field}", "count": {"$sum": 1}}
+    if label:
+        group["value"] = {"$first": f"${label}"}
+    return [{"$group": group}, {"$sort": {"count": -1, "_id": 1}}]
+
+
+def _sort_stage(q: Optional[str], ranked_ids: Optional[list[str]]) -> list[dict]:
+    if ranked_ids is not None:
+        return [
+            {"$addFields": {"_rank": {"$indexOfArray": [ranked_ids, "$id"]}}},
+            {"$sort": {"_rank": 1}},
+        ]
+    if q:
+        return [{"$sort": {"score": {"$meta": "textScore"}}}]
+    return [{"$sort": dict(KEYSET_SORT)}]
+
+
+async def property_facets(
+    database: AsyncIOMotorDatabase, query: dict, q: Optional[str], limit: int
+) -> tuple[list[dict], dict]:
+    """One ``$facet`` aggregation returning the result page and all facet counts."""
+    match = dict(query)
+    ranked_ids: Optional[list[str]] = None
+    if q:
+        search_index = get_search_index()
+        if search_index is None:
+            match["$text"] = {"$search": q}
+        else:
+            ranked_ids = search_index.search(q)
+            match["id"] = {"$in": ranked_ids}
+
+    # Open-ended sentinels give prices below the first and above the last boundary their own buckets
+    boundaries = [float("-inf"), *PRICE_BOUNDARIES, float("inf")]
+    pipeline = [
+        {"$match": match},
+        {
+            "$facet": {
+                "items": [
+                    *_sort_stage(q, ranked_ids),
+                    {"$limit": limit},
+                    {"$project": {"_id": 0, "_rank": 0}},
+                ],
+                "city": _value_counts("city_key", label="city"),
+                "property_type": _value_counts("property_type"),
+                "status": _value_counts("status"),
+                "price": [
+                    {
+                        "$bucket": {
+                            "groupBy": "$price",
+                            "boundaries": boundaries,
+                            "default": "other",
+                            "output": {"count": {"$sum": 1}},
+                        }
+                    }
+                ],
+            }
+        },
+    ]
+    result = await database.properties.aggregate(pipeline).to_list(1)
+    facet = result[0] if result else {"items": [], "city": [], "property_type": [], "status": [], "price": []}
+
+    upper = {lower: boundaries[i + 1] for i, lower in enumerate(boundaries[:-1])}
+    price = [
+        {
+            "min": None if row["_id"] == float("-inf") else row["_id"],
+            "max": None if upper[row["_id"]] == float("inf") else upper[row["_id"]],
+            "count": row["count"],
+        }
+        for row in facet["price"]
+        if row["_id"] != "other"  # missing or non-numeric price, skipped like null values in the other facets
+    ]
+
+    facets = {
+        "city": [{"value": row.get("value") or row["_id"], "count": row["count"]} for row in facet["city"] if row["_id"]],
+        "property_type": [{"value": row["_id"], "count": row["count"]} for row in facet["property_type"] if row["_id"]],
+        "status": [{"value": row["_id"], "count": row["count"]} for row in facet["status"] if row["_id"]],
+        "price": price,
+    }
+    return facet["items"], facets
@@ -0,0 +1,95 @@
+"""Trusted-read serialization for documents that were validated on write.
+
+``trusted_dump(Model, doc)`` projects a Mongo document onto ``Model``'s
+fields, fills defaults and recurses into nested models. It does not run
+validation. Routes opt in by returning ``FastJSONResponse`` themselves, which
+makes FastAPI skip its ``response_model`` pass; the ``response_model`` stays on
+the route for the OpenAPI schema.
+
+Values are converted with ``pydantic_core.to_jsonable_python`` (the same
+datetime formatting as ``model_dump(mode="json")``) and then encoded the way
+``JSONResponse`` encodes them. For a document that passed validation when
+it was written, the body therefore equals what the ``response_model`` path
+produces, including ``json.dumps`` float formatting such as ``1e-07``.
+tests/test_fast_json.py checks this for every model that opts in. A
+document missing a required field raises the ``ValidationError`` that
+validation would have raised.
+"""
+from __future__ import annotations
+
+import json
+from functools import lru_cache
+from typing import Any, Optional, Union, get_args, get_origin
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined, ValidationError, to_jsonable_python
+
+
+def encode(content: Any) -> bytes:
+    """``content`` encoded exactly as ``JSONResponse`` would encode its ``jsonable_encoder`` output."""
+    return json.dumps(
+        to_jsonable_python(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return encode(content)
+
+
+def _nested_model(annotation: Any) -> tuple[Optional[type[BaseModel]], bool]:
+    """``(model, is_list)`` when ``annotation`` is a model, a list of models or an Optional of either."""
+    origin = get_origin(annotation)
+    if origin is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        return _nested_model(args[0]) if len(args) == 1 else (None, False)
+    if origin is list:
+        inner, _ = _nested_model(get_args(annotation)[0])
+        return inner, inner is not None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+def _is_float(annotation: Any) -> bool:
+    if get_origin(annotation) is Union:
+        return set(get_args(annotation)) == {float, type(None)}
+    return annotation is float
+
+
+@lru_cache(maxsize=None)
+def _plan(model: type[BaseModel]) -> tuple:
+    plan = []
+    for name, info in model.model_fields.items():
+        nested, is_list = _nested_model(info.annotation)
+        plan.append((name, info, nested, is_list, _is_float(info.annotation)))
+    return tuple(plan)
+
+
+def trusted_dump(model: type[BaseModel], doc: Any) -> Any:
+    if doc is None:
+        return None
+    if isinstance(doc, BaseModel):
+        doc = doc.__dict__
+    out = {}
+    for name, info, nested, is_list, is_float in _plan(model):
+        value = doc[name] if name in doc else info.get_default(call_default_factory=True)
+        if value is PydanticUndefined:
+            raise ValidationError.from_exception_data(
+                model.__name__, [{"type": "missing", "loc": (name,), "input": doc}]
+            )
+        if nested is not None and value is not None:
+            value = [trusted_dump(nested, v) for v in value] if is_list else trusted_dump(nested, value)
+        elif is_float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)  # Mongo may hold whole numbers as ints; the model would emit 1.0
+        out[name] = value
+    return out
+
+
+def trusted_json(model: type[BaseModel], doc: Any) -> bytes:
+    return encode(trusted_dump(model, doc))
+
+
+def trusted_json_list(model: type[BaseModel], docs: list) -> bytes:
+    return encode([trusted_dump(model, doc) for doc in docs])
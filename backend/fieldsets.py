@@ -0,0 +1,75 @@
+"""Sparse fieldsets: ``?fields=id,title,price`` on read endpoints.
+
+The requested names are checked against the public model and normalised to
+model order (``id`` is always included), so equal selections share cache
+keys. They become a Mongo projection and a derived response model, which is
+cached per selection.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Callable, Iterable, Optional, Sequence
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, create_model
+
+from fast_json import trusted_dump
+from models import LeadPublic, PropertyPublic
+
+
+FieldSet = Optional[tuple[str, ...]]
+
+
+def parse_fields(raw: Optional[str], allowed: Sequence[str]) -> FieldSet:
+    if raw is None:
+        return None
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = sorted(requested - set(allowed))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}",
+        )
+    requested.add("id")
+    return tuple(name for name in allowed if name in requested)
+
+
+def fields_param(allowed: Sequence[str]) -> Callable[..., FieldSet]:
+    """FastAPI dependency parsing ``?fields=`` against ``allowed``."""
+
+    def dependency(
+        fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(allowed)}"),
+    ) -> FieldSet:
+        return parse_fields(fields, allowed)
+
+    return dependency
+
+
+property_fields = fields_param(list(PropertyPublic.model_fields))
+lead_fields = fields_param(list(LeadPublic.model_fields))
+
+
+def projection(fields: FieldSet, extra: Iterable[str] = ()) -> dict:
+    """Mongo projection for ``fields`` plus any ``extra`` keys the handler itself needs."""
+    if fields is None:
+        return {"_id": 0}
+    return {**{name: 1 for name in (*fields, *extra)}, "_id": 0}
+
+
+@lru_cache(maxsize=256)
+def sparse_model(model: type[BaseModel], fields: FieldSet) -> type[BaseModel]:
+    if fields is None:
+        return model
+    return create_model(
+        f"{model.__name__}_{'_'.join(fields)}",
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields},
+    )
+
+
+def dump_sparse_items(
+    model: type[BaseModel], data: dict, items_key: str, item_model: type[BaseModel], fields: FieldSet
+) -> dict:
+    """``trusted_dump(model, data)`` with the ``items_key`` list restricted to ``fields``."""
+    out = trusted_dump(model, {**data, items_key: []})
+    out[items_key] = [trusted_dump(sparse_model(item_model, fields), item) for item in data[items_key]]
+    return out
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from metrics import password_hash_seconds
+
+
+T = TypeVar("T")
+
+
+def _default_workers() -> int:
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+class HashingExecutor:
+    """Bounded thread pool for CPU-heavy password hashing.
+
+    bcrypt releases the GIL while it works, so a plain thread pool lets
+    hashing scale with cores while keeping the event loop free.
+    ``max_pending`` caps how many calls may wait for a worker; callers beyond
+    that are held back on the event loop instead of piling up in the pool.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None) -> None:
+        self.max_workers = max_workers or _default_workers()
+        self.max_pending = max_pending if max_pending is not None else self.max_workers * 16
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hashing")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._peak_queue_depth = 0
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_pending)
+        return self._slots
+
+    def _wrap(self, func: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        ok = False
+        try:
+            result = func(*args)
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self._running -= 1
+                if ok:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        started = time.perf_counter()
+        async with self._get_slots():
+            with self._lock:
+                self._queued += 1
+                self._peak_queue_depth = max(self._peak_queue_depth, self._queued)
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._executor, self._wrap, func, *args)
+            finally:
+                password_hash_seconds.observe(time.perf_counter() - started, getattr(func, "__name__", "call"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "queue_depth": self._queued,
+                "in_flight": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "peak_queue_depth": self._peak_queue_depth,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hashing_executor: Optional[HashingExecutor] = None
+
+
+def get_hashing_executor() -> HashingExecutor:
+    global _hashing_executor
+    if _hashing_executor is None:
+        workers = os.environ.get("PASSWORD_HASH_WORKERS")
+        pending = os.environ.get("PASSWORD_HASH_MAX_PENDING")
+        _hashing_executor = HashingExecutor(
+            max_workers=int(workers) if workers else None,
+            max_pending=int(pending) if pending else None,
+        )
+    return _hashing_executor
+
+
+def shutdown_hashing_executor() -> None:
+    global _hashing_executor
+    if _hashing_executor is not None:
+        _hashing_executor.shutdown()
+        _hashing_executor = None
@@ -0,0 +1,121 @@
+"""``Idempotency-Key`` support for non-repeatable POSTs.
+
+Each key is claimed by inserting ``{"_id": key, "status": "pending"}`` into
+``idempotency_keys`` (TTL-indexed on ``created_at``), and the finished
+response is written back to it. Replays are answered from an in-process
+LRU or from that document without running the handler again. Concurrent
+duplicates in this process share one call through ``SingleFlight``. Those
+in other processes poll the pending record until it completes. A key
+reused with a different body is rejected with 422.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from cache import TTLCache, env_cache
+from singleflight import SingleFlight
+
+
+# How long a duplicate waits for the first request before giving up with 409
+WAIT_SECONDS = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", 15))
+# A pending claim older than this is assumed abandoned (its process died) and taken over
+LOCK_SECONDS = float(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", 60))
+POLL_SECONDS = 0.1
+
+_responses: TTLCache[tuple[str, dict]] = env_cache("IDEMPOTENCY", default_entries=10000, default_ttl=24 * 3600)
+_flight = SingleFlight()
+
+
+def request_fingerprint(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _check_fingerprint(record_hash: str, fingerprint: str) -> None:
+    if record_hash != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+
+
+async def _claim_or_wait(database: AsyncIOMotorDatabase, record_id: str, fingerprint: str) -> Optional[dict]:
+    """Claim ``record_id`` (returns None) or return the response stored by whoever owns it."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + WAIT_SECONDS
+    while True:
+        now = datetime.now(timezone.utc)
+        try:
+            await database.idempotency_keys.insert_one(
+                {"_id": record_id, "status": "pending", "request_hash": fingerprint, "created_at": now, "locked_at": now}
+            )
+            return None
+        except DuplicateKeyError:
+            pass
+
+        record = await database.idempotency_keys.find_one({"_id": record_id})
+        if record is None:
+            continue  # the owner failed and released the key; try to claim it again
+        _check_fingerprint(record["request_hash"], fingerprint)
+        if record["status"] == "done":
+            return record["response"]
+
+        locked_at = record["locked_at"]
+        if now - locked_at.replace(tzinfo=locked_at.tzinfo or timezone.utc) > timedelta(seconds=LOCK_SECONDS):
+            taken = await database.idempotency_keys.update_one(
+                {"_id": record_id, "status": "pending", "locked_at": record["locked_at"]},
+                {"$set": {"locked_at": now}},
+            )
+            if taken.modified_count:
+                return None
+        if loop.time() >= deadline:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        await asyncio.sleep(POLL_SECONDS)
+
+
+async def run_idempotent(
+    database: AsyncIOMotorDatabase,
+    scope: str,
+    key: str,
+    payload: dict,
+    handler: Callable[[], Awaitable[dict]],
+) -> dict:
+    """Run ``handler`` at most once per ``(scope, key)`` and return its (possibly stored) response.
+
+    ``scope`` should include the caller's id so keys never collide across users.
+    """
+    record_id = f"{scope}:{key}"
+    fingerprint = request_fingerprint(payload)
+    cached = _responses.get(record_id)
+    if cached is not None:
+        _check_fingerprint(cached[0], fingerprint)
+        return cached[1]
+
+    async def execute() -> dict:
+        stored = await _claim_or_wait(database, record_id, fingerprint)
+        if stored is not None:
+            _responses.set(record_id, (fingerprint, stored))
+            return stored
+        try:
+            response = await handler()
+        except BaseException:
+            # Release the key so the client can retry a request that never completed
+            await database.idempotency_keys.delete_one({"_id": record_id, "status": "pending"})
+            raise
+        await database.idempotency_keys.update_one(
+            {"_id": record_id},
+            {"$set": {"status": "done", "response": response, "completed_at": datetime.now(timezone.utc)}},
+        )
+        _responses.set(record_id, (fingerprint, response))
+        return response
+
+    return await _flight.do(("idempotency", record_id, fingerprint), execute)
+
+
+def idempotency_stats() -> dict:
+    return {"responses": _responses.stats(), "flight": _flight.stats()}
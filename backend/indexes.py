@@ -0,0 +1,189 @@
+"""Declarative MongoDB index registry.
+
+Indexes are applied idempotently at startup (see ``lifespan`` in server.py).
+Run ``python indexes.py --dry-run`` to print the diff against the live
+database without changing anything, or without flags to apply it. Each
+index is created on its own, so one failure (e.g. duplicate values under a
+new unique index) does not keep the others from being built.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import PyMongoError
+
+
+logger = logging.getLogger(__name__)
+
+def _key_of(info: dict) -> tuple:
+    return tuple(tuple(k) for k in info.get("key", []))
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: tuple
+    unique: bool = False
+    options: dict = field(default_factory=dict, hash=False)
+
+    @property
+    def name(self) -> str:
+        return "_".join(f"{k}_{d}" for k, d in self.keys)
+
+    @property
+    def key_signature(self) -> tuple:
+        # Mongo reports every text index under the same synthetic key
+        if any(d == TEXT for _, d in self.keys):
+            return (("_fts", TEXT), ("_ftsx", 1))
+        return tuple(self.keys)
+
+    def matches(self, info: dict) -> bool:
+        if _key_of(info) != self.key_signature:
+            return False
+        if bool(info.get("unique", False)) != self.unique:
+            return False
+        return all(info.get(opt) == value for opt, value in self.options.items())
+
+
+INDEXES: list[IndexSpec] = [
+    # users: login / register by email, token lookup by id, pending list, team list, seeding
+    IndexSpec("users", (("email", ASCENDING),), unique=True),
+    IndexSpec("users", (("id", ASCENDING),), unique=True),
+    IndexSpec("users", (("is_verified", ASCENDING),)),
+    IndexSpec("users", (("franchise_id", ASCENDING),)),
+    IndexSpec("users", (("role", ASCENDING),)),
+    # franchises
+    IndexSpec("franchises", (("id", ASCENDING),), unique=True),
+    # properties: detail/update/delete by id, listing filters, dashboard counts
+    IndexSpec("properties", (("id", ASCENDING),), unique=True),
+    IndexSpec("properties", (("created_at", DESCENDING), ("id", DESCENDING))),
+    IndexSpec("properties", (("city_key", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING))),
+    IndexSpec("properties", (("franchise_id", ASCENDING), ("status", ASCENDING))),
+    IndexSpec("properties", (("assigned_agent_id", ASCENDING),)),
+    IndexSpec("properties", (("property_type", ASCENDING), ("price", ASCENDING))),
+    IndexSpec("properties", (("price", ASCENDING),)),
+    IndexSpec(
+        "properties",
+        (("title", TEXT), ("description", TEXT)),
+        options={"weights": {"title": 3, "description": 1}},
+    ),
+    # leads: lookup by id, per-role dashboards ordered by recency, payment matching, reconciliation scan
+    IndexSpec("leads", (("id", ASCENDING),), unique=True),
+    IndexSpec("leads", (("franchise_id", ASCENDING), ("created_at", DESCENDING))),
+    IndexSpec("leads", (("assigned_agent_id", ASCENDING), ("created_at", DESCENDING))),
+    IndexSpec("leads", (("customer_id", ASCENDING), ("created_at", DESCENDING))),
+    IndexSpec("leads", (("razorpay_order_id", ASCENDING),), options={"sparse": True}),
+    IndexSpec("leads", (("type", ASCENDING), ("status", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING))),
+    # webhook_events: _id is the Razorpay event id (dedupe); kept for 30 days
+    IndexSpec("webhook_events", (("received_at", ASCENDING),), options={"expireAfterSeconds": 30 * 24 * 3600}),
+    # idempotency_keys: _id is "<scope>:<Idempotency-Key>"; replays are honoured for 24 hours
+    IndexSpec("idempotency_keys", (("created_at", ASCENDING),), options={"expireAfterSeconds": 24 * 3600}),
+]
+
+
+async def find_duplicates(database: AsyncIOMotorDatabase, spec: IndexSpec, limit: int = 3) -> list[dict]:
+    """Sample key values that occur more than once and would make a unique ``spec`` fail."""
+    pipeline = [
+        {"$group": {"_id": {k: f"${k}" for k, _ in spec.keys}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit},
+    ]
+    return await database[spec.collection].aggregate(pipeline).to_list(limit)
+
+
+async def diff_indexes(
+    database: AsyncIOMotorDatabase, specs: list[IndexSpec] = INDEXES, check_duplicates: bool = False
+) -> dict[str, Any]:
+    """Return the registry indexes that are missing or conflict with what exists.
+
+    With ``check_duplicates`` missing unique indexes are also checked for
+    existing duplicate keys, which would make creating them fail.
+    """
+    missing: list[IndexSpec] = []
+    conflicting: list[tuple[IndexSpec, dict]] = []
+    existing_by_collection: dict[str, dict] = {}
+
+    for spec in specs:
+        if spec.collection not in existing_by_collection:
+            existing_by_collection[spec.collection] = await database[spec.collection].index_information()
+        existing = existing_by_collection[spec.collection]
+
+        same_keys = [info for info in existing.values() if _key_of(info) == spec.key_signature]
+        if any(spec.matches(info) for info in same_keys):
+            continue
+        if same_keys or spec.name in existing:
+            conflicting.append((spec, existing.get(spec.name) or same_keys[0]))
+        else:
+            missing.append(spec)
+
+    duplicates: list[tuple[IndexSpec, list[dict]]] = []
+    if check_duplicates:
+        for spec in missing:
+            if spec.unique:
+                found = await find_duplicates(database, spec)
+                if found:
+                    duplicates.append((spec, found))
+
+    return {"missing": missing, "conflicting": conflicting, "duplicates": duplicates}
+
+
+async def ensure_indexes(database: AsyncIOMotorDatabase, specs: list[IndexSpec] = INDEXES) -> dict[str, list]:
+    """Create every missing registry index. Conflicts are reported, never dropped.
+
+    Returns ``{"created": [name, ...], "failed": [(name, error), ...]}``.
+    """
+    diff = await diff_indexes(database, specs)
+    created, failed = [], []
+    for spec in diff["missing"]:
+        name = f"{spec.collection}.{spec.name}"
+        try:
+            await database[spec.collection].create_index(
+                list(spec.keys), name=spec.name, unique=spec.unique, **spec.options
+            )
+        except PyMongoError as exc:
+            logger.error("Could not create index %s: %s", name, exc)
+            failed.append((name, str(exc)))
+        else:
+            created.append(name)
+    return {"created": created, "failed": failed}
+
+
+def format_diff(diff: dict[str, Any]) -> str:
+    lines = []
+    for spec in diff["missing"]:
+        flags = " unique" if spec.unique else ""
+        lines.append(f"+ {spec.collection}.{spec.name}{flags} {dict(spec.keys)} {spec.options or ''}".rstrip())
+    for spec, info in diff["conflicting"]:
+        lines.append(f"! {spec.collection}.{spec.name} conflicts with existing {info}")
+    for spec, found in diff.get("duplicates", []):
+        examples = ", ".join(f"{doc['_id']} x{doc['count']}" for doc in found)
+        lines.append(f"x {spec.collection}.{spec.name} cannot be created: duplicate keys {examples}")
+    return "\n".join(lines) or "Indexes are up to date"
+
+
+async def _main(dry_run: bool) -> None:
+    from db import db, close_db_client
+
+    try:
+        diff = await diff_indexes(db, check_duplicates=True)
+        print(format_diff(diff))
+        if not dry_run and diff["missing"]:
+            report = await ensure_indexes(db)
+            print(f"Created {len(report['created'])} index(es)")
+            for name, error in report["failed"]:
+                print(f"Failed {name}: {error}")
+    finally:
+        await close_db_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the MongoDB index registry")
+    parser.add_argument("--dry-run", action="store_true", help="print the index diff without applying it")
+    args = parser.parse_args()
+    asyncio.run(_main(args.dry_run))
@@ -0,0 +1,279 @@
+"""Prometheus text-format metrics.
+
+HTTP timings come from ``MetricsMiddleware``. Mongo command and
+connection-pool timings come from the pymongo listeners registered on the
+client in db.py, and password hashing time is recorded by ``hashing.py``.
+Everything is exposed at ``GET /metrics``. pymongo calls its listeners
+from driver threads, so every metric takes a lock.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Iterable, Optional
+
+from pymongo import monitoring
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], object] = {}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_series(labels, value))
+        return lines
+
+    def _render_series(self, labels: tuple[str, ...], value: object) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def _render_series(self, labels: tuple[str, ...], value: object) -> list[str]:
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            le = 'le="%s"' % bound
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {count}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")
+)
+http_responses = Counter(
+    "http_responses_total", "HTTP responses by route template and status", ("method", "route", "status")
+)
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served", ("method",))
+mongo_command_seconds = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("collection", "command", "outcome")
+)
+mongo_pool_wait_seconds = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the pool", ("address",)
+)
+mongo_pool_checked_out = Gauge("mongo_pool_connections_checked_out", "Connections currently checked out", ("address",))
+mongo_pool_checkout_failures = Counter(
+    "mongo_pool_checkout_failures_total", "Failed connection checkouts", ("address", "reason")
+)
+password_hash_seconds = Histogram(
+    "password_hash_duration_seconds", "Password hash/verify time including executor queueing", ("operation",)
+)
+
+REGISTRY: list[_Metric] = [
+    http_request_seconds,
+    http_responses,
+    http_in_flight,
+    mongo_command_seconds,
+    mongo_pool_wait_seconds,
+    mongo_pool_checked_out,
+    mongo_pool_checkout_failures,
+    password_hash_seconds,
+]
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# ---------- HTTP ----------
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by its route template (e.g. ``/api/properties/{property_id}``)."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._templates: dict[object, str] = {}
+
+    def _route_template(self, scope: dict) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "<unmatched>"
+        template = self._templates.get(endpoint)
+        if template is None:
+            router = scope["app"].router
+            paths = {getattr(r, "endpoint", None): getattr(r, "path", "") for r in router.routes}
+            template = self._templates[endpoint] = paths.get(endpoint, "<unknown>")
+        return template
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        http_in_flight.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(method)
+            # The router writes the matched endpoint into this same scope dict
+            route = self._route_template(scope)
+            http_request_seconds.observe(time.perf_counter() - started, method, route)
+            http_responses.inc(method, route, status)
+
+
+# ---------- MongoDB ----------
+
+class CommandMetricsListener(monitoring.CommandListener):
+    def __init__(self) -> None:
+        self._collections: dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event) -> tuple:
+        return event.request_id, event.connection_id
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        with self._lock:
+            self._collections[self._key(event)] = target if isinstance(target, str) else "<none>"
+
+    def _finish(self, event, outcome: str) -> None:
+        with self._lock:
+            collection = self._collections.pop(self._key(event), "<unknown>")
+        mongo_command_seconds.observe(event.duration_micros / 1e6, collection, event.command_name, outcome)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, "ok")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, "error")
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Checkout waits, timed per thread: pymongo emits start and end on the thread doing the checkout."""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def _waited(self) -> Optional[float]:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return None if started is None else time.perf_counter() - started
+
+    def connection_check_out_started(self, event) -> None:
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event) -> None:
+        waited = self._waited()
+        if waited is not None:
+            mongo_pool_wait_seconds.observe(waited, self._address(event))
+        mongo_pool_checked_out.inc(self._address(event))
+
+    def connection_check_out_failed(self, event) -> None:
+        self._waited()
+        mongo_pool_checkout_failures.inc(self._address(event), str(event.reason))
+
+    def connection_checked_in(self, event) -> None:
+        mongo_pool_checked_out.dec(self._address(event))
+
+    # Remaining pool events are not measured
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        pass
+
+
+def mongo_listeners() -> list:
+    return [CommandMetricsListener(), PoolMetricsListener()]
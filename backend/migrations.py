@@ -0,0 +1,67 @@
+"""Idempotent data migrations.
+
+Each migration only touches documents that still need it, so they are safe to
+run on every startup (see ``lifespan`` in server.py) or by hand with
+``python migrations.py``.
+"""
+from __future__ import annotations
+
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from dashboard_stats import materialized_ready, rebuild_stats
+from models import normalize_city
+
+
+async def backfill_city_keys(database: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """Populate ``properties.city_key`` for documents written before it existed."""
+    updated = 0
+    batch: list[UpdateOne] = []
+    cursor = database.properties.find(
+        {"city_key": {"$exists": False}}, {"_id": 1, "city": 1}, batch_size=batch_size
+    )
+    async for doc in cursor:
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"city_key": normalize_city(doc.get("city") or "")}}))
+        if len(batch) >= batch_size:
+            result = await database.properties.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+            batch = []
+    if batch:
+        result = await database.properties.bulk_write(batch, ordered=False)
+        updated += result.modified_count
+    return updated
+
+
+async def backfill_dashboard_stats(database: AsyncIOMotorDatabase) -> int:
+    """Rebuild ``franchise_stats`` / ``agent_stats`` once, before reads switch to them.
+
+    Recomputes every document, including partial ones created by write hooks
+    before the first rebuild, then records the marker reads wait for.
+    """
+    if await materialized_ready(database):
+        return 0
+    result = await rebuild_stats(database)
+    return result["franchises"] + result["agents"]
+
+
+MIGRATIONS = [backfill_city_keys, backfill_dashboard_stats]
+
+
+async def run_migrations(database: AsyncIOMotorDatabase) -> dict[str, int]:
+    return {migration.__name__: await migration(database) for migration in MIGRATIONS}
+
+
+async def _main() -> None:
+    from db import db, close_db_client
+
+    try:
+        for name, count in (await run_migrations(db)).items():
+            print(f"{name}: {count} document(s) updated")
+    finally:
+        await close_db_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -4,11 +4,18 @@ from datetime import datetime, timezone
 from typing import Optional, Literal
 import uuid
 
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, model_validator
 
 
 def utc_now() -> datetime:
-    return datetime.now(timezone.utc)
+    """Current UTC time truncated to the millisecond precision Mongo stores."""
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def normalize_city(city: str) -> str:
+    """Index key for case/whitespace-insensitive city matching."""
+    return " ".join(city.split()).casefold()
 
 
 class UserBase(BaseModel):
@@ -110,9 +117,15 @@ class PropertyInDB(PropertyBase):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     franchise_id: str
     assigned_agent_id: Optional[str] = None
+    city_key: str = ""
     created_at: datetime = Field(default_factory=utc_now)
     updated_at: datetime = Field(default_factory=utc_now)
 
+    @model_validator(mode="after")
+    def _set_city_key(self) -> "PropertyInDB":
+        self.city_key = normalize_city(self.city)
+        return self
+
 
 class PropertyPublic(PropertyBase):
     id: str
@@ -120,6 +133,59 @@ class PropertyPublic(PropertyBase):
     assigned_agent_id: Optional[str] = None
 
 
+class PropertyBulkUpdate(BaseModel):
+    id: str
+    status: Optional[Literal["available", "booked", "sold"]] = None
+    price: Optional[float] = None
+
+
+class BulkRowResult(BaseModel):
+    row: int
+    status: Literal["inserted", "updated", "not_found", "error", "skipped"]
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkPropertyReport(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    aborted: bool = False
+    results: list[BulkRowResult] = []
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class PriceBucketCount(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+    count: int
+
+
+class PropertyFacets(BaseModel):
+    city: list[FacetCount]
+    property_type: list[FacetCount]
+    status: list[FacetCount]
+    price: list[PriceBucketCount]
+
+
+class PropertySearchResult(BaseModel):
+    items: list[PropertyPublic]
+    facets: PropertyFacets
+
+
+class PropertyBatchRequest(BaseModel):
+    ids: list[str] = Field(min_length=1)
+
+
+class PropertyBatchResult(BaseModel):
+    items: list[PropertyPublic]
+    missing: list[str]
+
+
 class LeadBase(BaseModel):
     property_id: str
     type: Literal["site_visit", "loan", "booking"]
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from typing import NoReturn
+
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from models import UserInDB
+
+
+def property_write_scope(user: UserInDB) -> dict:
+    """Filter restricting property writes to what ``user`` may edit."""
+    if user.role == "agent":
+        return {"assigned_agent_id": user.id}
+    if user.role == "franchise_owner":
+        return {"franchise_id": user.franchise_id or ""}
+    return {}
+
+
+async def raise_not_found_or_forbidden(
+    collection: AsyncIOMotorCollection, doc_id: str, not_found: str, forbidden: str
+) -> NoReturn:
+    """Explain why a scoped ``find_one_and_*`` matched nothing.
+
+    Writes fold their authorization into the filter, so a miss means either
+    the document does not exist (404) or the caller may not touch it (403).
+    Only this failure path pays for the extra existence check.
+    """
+    exists = await collection.find_one({"id": doc_id}, {"_id": 1})
+    if exists is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    raise HTTPException(status_code=403, detail=forbidden)
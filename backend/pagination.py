@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+
+# Keyset order shared by the cursor filter and the (created_at, id) index.
+KEYSET_SORT = [("created_at", -1), ("id", -1)]
+
+
+def encode_cursor(doc: dict) -> str:
+    created_at = doc["created_at"]
+    raw = json.dumps([created_at.isoformat(), doc["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), str(doc_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from e
+
+
+def keyset_filter(query: dict, cursor: Optional[str]) -> dict:
+    """Restrict ``query`` to documents strictly after ``cursor`` in ``KEYSET_SORT`` order."""
+    if not cursor:
+        return query
+    created_at, doc_id = decode_cursor(cursor)
+    after = {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": doc_id}},
+        ]
+    }
+    return {"$and": [query, after]} if query else after
+
+
+def split_page(docs: list[dict], limit: int) -> tuple[list[dict], Optional[str]]:
+    """Trim a ``limit + 1`` fetch to one page and derive the next cursor."""
+    if len(docs) <= limit:
+        return docs, None
+    page = docs[:limit]
+    return page, encode_cursor(page[-1])
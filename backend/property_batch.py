@@ -0,0 +1,54 @@
+"""Resolve many properties by id with one ``$in`` query and a per-id cache.
+
+Cached entries are the public fields of each property; ids that do not exist
+are cached too, so repeated lookups of deleted ids stay cheap. Writes evict
+their ids through ``after_property_writes``.
+"""
+from __future__ import annotations
+
+import os
+from typing import Iterable
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from cache import TTLCache, env_cache
+from fieldsets import projection
+from models import PropertyPublic
+
+
+BATCH_MAX_IDS = int(os.environ.get("PROPERTY_BATCH_MAX_IDS", 500))
+
+_PUBLIC_PROJECTION = projection(tuple(PropertyPublic.model_fields))
+_MISSING: dict = {}
+
+_by_id: TTLCache[dict] = env_cache("PROPERTY_BATCH_CACHE", default_entries=10000, default_ttl=60)
+
+
+async def get_properties_by_id(database: AsyncIOMotorDatabase, ids: Iterable[str]) -> tuple[list[dict], list[str]]:
+    """``(documents in request order, ids that do not exist)``; duplicate ids are collapsed."""
+    wanted = list(dict.fromkeys(ids))
+    found: dict[str, dict] = {}
+    uncached = []
+    for property_id in wanted:
+        doc = _by_id.get(property_id)
+        if doc is None:
+            uncached.append(property_id)
+        elif doc is not _MISSING:
+            found[property_id] = doc
+
+    if uncached:
+        docs = await database.properties.find({"id": {"$in": uncached}}, _PUBLIC_PROJECTION).to_list(len(uncached))
+        for doc in docs:
+            found[doc["id"]] = doc
+        for property_id in uncached:
+            _by_id.set(property_id, found.get(property_id, _MISSING))
+
+    return [found[i] for i in wanted if i in found], [i for i in wanted if i not in found]
+
+
+def invalidate_properties(ids: Iterable[str]) -> None:
+    _by_id.invalidate_many(ids)
+
+
+def property_batch_cache_stats() -> dict:
+    return _by_id.stats()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+from models import normalize_city
+
+
+@dataclass(frozen=True)
+class PropertyFilter:
+    city_key: Optional[str] = None
+    city_match: Literal["exact", "prefix"] = "prefix"
+    property_type: Optional[str] = None
+    max_price: Optional[float] = None
+
+    def mongo_query(self) -> dict:
+        query: dict = {}
+        if self.city_key:
+            if self.city_match == "exact":
+                query["city_key"] = self.city_key
+            else:
+                # Anchored, case-sensitive regex on the normalized key is an index range scan
+                query["city_key"] = {"$regex": f"^{re.escape(self.city_key)}"}
+        if self.property_type:
+            query["property_type"] = self.property_type
+        if self.max_price is not None:
+            query["price"] = {"$lte": self.max_price}
+        return query
+
+    def matches(self, doc: dict) -> bool:
+        """Whether a property document passes this filter."""
+        city_key = doc.get("city_key") or ""
+        if self.city_key:
+            if self.city_match == "exact" and city_key != self.city_key:
+                return False
+            if self.city_match == "prefix" and not city_key.startswith(self.city_key):
+                return False
+        if self.property_type and doc.get("property_type") != self.property_type:
+            return False
+        if self.max_price is not None and (doc.get("price") or 0) > self.max_price:
+            return False
+        return True
+
+
+def property_filters(
+    city: Optional[str] = None,
+    city_match: Literal["exact", "prefix"] = "prefix",
+    type: Optional[str] = None,
+    max_price: Optional[float] = None,
+) -> PropertyFilter:
+    """Query parameters shared by the property listing and facet endpoints."""
+    return PropertyFilter(
+        city_key=normalize_city(city) if city else None,
+        city_match=city_match,
+        property_type=type or None,
+        max_price=max_price,
+    )
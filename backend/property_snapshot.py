@@ -0,0 +1,217 @@
+"""Columnar in-memory snapshot of the ``properties`` collection.
+
+With ``PROPERTY_LIST_ENGINE=snapshot`` the un-searched ``GET /api/properties``
+path is answered from NumPy columns instead of Mongo. The snapshot is loaded at
+startup, patched by local property writes (``record_property_write``) and
+fully resynced every ``PROPERTY_SNAPSHOT_RESYNC_SECONDS`` to pick up writes
+made by other processes. Local writes made while a resync is loading are
+replayed onto the new snapshot before it replaces the old one.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from pagination import decode_cursor
+from property_filters import PropertyFilter
+
+
+logger = logging.getLogger(__name__)
+
+STATUS_CODES = {"available": 0, "booked": 1, "sold": 2}
+
+
+def _millis(value: datetime) -> datetime:
+    """``value`` at the millisecond precision Mongo stores, so cursors match after a reload."""
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def _timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class _Categories:
+    """Stable string -> int code mapping for categorical columns."""
+
+    def __init__(self) -> None:
+        self.codes: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class PropertySnapshot:
+    def __init__(self, capacity: int = 1024) -> None:
+        self._size = 0
+        self._rows: dict[str, int] = {}
+        self._docs: list[Optional[dict]] = []
+        self._cities = _Categories()
+        self._types = _Categories()
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int) -> None:
+        def grow(old: Optional[np.ndarray], dtype, fill) -> np.ndarray:
+            new = np.full(capacity, fill, dtype=dtype)
+            if old is not None:
+                new[: self._size] = old[: self._size]
+            return new
+
+        self._alive = grow(getattr(self, "_alive", None), np.bool_, False)
+        self._price = grow(getattr(self, "_price", None), np.float64, np.nan)
+        self._status = grow(getattr(self, "_status", None), np.int8, -1)
+        self._city = grow(getattr(self, "_city", None), np.int32, -1)
+        self._type = grow(getattr(self, "_type", None), np.int32, -1)
+        self._created = grow(getattr(self, "_created", None), np.float64, 0.0)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def upsert(self, doc: dict) -> None:
+        row = self._rows.get(doc["id"])
+        if row is None:
+            if self._size == len(self._alive):
+                self._alloc(max(1024, self._size * 2))
+            row = self._rows[doc["id"]] = self._size
+            self._size += 1
+            self._docs.append(None)
+        doc = {k: v for k, v in doc.items() if k != "_id"}
+        doc["created_at"] = _millis(doc["created_at"])
+        self._docs[row] = doc
+        self._alive[row] = True
+        self._price[row] = float(doc.get("price") or 0)
+        self._status[row] = STATUS_CODES.get(doc.get("status"), -1)
+        self._city[row] = self._cities.code(doc.get("city_key") or "")
+        self._type[row] = self._types.code(doc.get("property_type") or "")
+        self._created[row] = _timestamp(doc["created_at"])
+
+    def remove(self, property_id: str) -> None:
+        row = self._rows.pop(property_id, None)
+        if row is not None:
+            self._alive[row] = False
+            self._docs[row] = None
+
+    def _mask(self, flt: PropertyFilter) -> np.ndarray:
+        n = self._size
+        mask = self._alive[:n].copy()
+        if flt.max_price is not None:
+            mask &= self._price[:n] <= flt.max_price
+        if flt.property_type:
+            code = self._types.codes.get(flt.property_type)
+            if code is None:
+                return np.zeros(n, dtype=np.bool_)
+            mask &= self._type[:n] == code
+        if flt.city_key:
+            if flt.city_match == "exact":
+                codes = [self._cities.codes[flt.city_key]] if flt.city_key in self._cities.codes else []
+            else:
+                codes = [c for key, c in self._cities.codes.items() if key.startswith(flt.city_key)]
+            mask &= np.isin(self._city[:n], codes)
+        return mask
+
+    def query(self, flt: PropertyFilter, limit: int, cursor: Optional[str] = None) -> list[dict]:
+        """Up to ``limit + 1`` documents in keyset order (created_at, id) descending."""
+        mask = self._mask(flt)
+        created = self._created[: self._size]
+        if cursor:
+            after_ts, after_id = decode_cursor(cursor)
+            ts = _timestamp(after_ts)
+            ties = np.flatnonzero(mask & (created == ts))
+            mask &= created < ts
+            for row in ties:
+                if self._docs[row]["id"] < after_id:
+                    mask[row] = True
+
+        rows = np.flatnonzero(mask)
+        if rows.size == 0:
+            return []
+        neg_sorted = -created[rows]
+        order = np.argsort(neg_sorted, kind="stable")
+        want = limit + 1
+        if want < order.size:
+            # Extend the window over rows tied on created_at so the id tiebreak is exact
+            boundary = neg_sorted[order[want - 1]]
+            want = int(np.searchsorted(neg_sorted[order], boundary, side="right"))
+        window = rows[order[:want]]
+        docs = sorted((self._docs[row] for row in window), key=lambda d: (_timestamp(d["created_at"]), d["id"]), reverse=True)
+        return docs[: limit + 1]
+
+    async def load(self, database: AsyncIOMotorDatabase) -> int:
+        async for doc in database.properties.find({}, {"_id": 0}):
+            self.upsert(doc)
+        return len(self)
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._rows),
+            "rows": self._size,
+            "capacity": len(self._alive),
+            "cities": len(self._cities.values),
+            "property_types": len(self._types.values),
+        }
+
+
+_snapshot: Optional[PropertySnapshot] = None
+# Local writes made while a resync is loading, or None when no resync is running
+_pending_writes: Optional[list[tuple[str, Optional[dict]]]] = None
+
+
+def snapshot_enabled() -> bool:
+    return os.environ.get("PROPERTY_LIST_ENGINE", "mongo").lower() == "snapshot"
+
+
+def get_property_snapshot() -> Optional[PropertySnapshot]:
+    """The loaded snapshot, or ``None`` when listings are served from Mongo."""
+    return _snapshot if snapshot_enabled() else None
+
+
+def _apply(snapshot: PropertySnapshot, property_id: str, doc: Optional[dict]) -> None:
+    if doc is None:
+        snapshot.remove(property_id)
+    else:
+        snapshot.upsert(doc)
+
+
+def record_property_write(property_id: str, doc: Optional[dict]) -> None:
+    """Apply a local write (``doc`` is None for a delete) to the live snapshot and any resync in flight."""
+    if _pending_writes is not None:
+        _pending_writes.append((property_id, doc))
+    if _snapshot is not None:
+        _apply(_snapshot, property_id, doc)
+
+
+async def resync_property_snapshot(database: AsyncIOMotorDatabase) -> int:
+    global _snapshot, _pending_writes
+    fresh = PropertySnapshot()
+    _pending_writes = []
+    try:
+        await fresh.load(database)
+        # The load cursor may already have passed these documents; replaying in order leaves the latest state
+        for property_id, doc in _pending_writes:
+            _apply(fresh, property_id, doc)
+    finally:
+        _pending_writes = None
+    _snapshot = fresh
+    return len(fresh)
+
+
+async def run_snapshot_resync(database: AsyncIOMotorDatabase) -> None:
+    interval = float(os.environ.get("PROPERTY_SNAPSHOT_RESYNC_SECONDS", 300))
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await resync_property_snapshot(database)
+        except Exception:  # noqa: BLE001
+            logger.exception("Property snapshot resync failed; keeping the previous snapshot")
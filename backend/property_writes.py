@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from cities import invalidate_city_suggestions
+from conditional import bump_collection_version
+from property_batch import invalidate_properties
+from property_snapshot import record_property_write, snapshot_enabled
+from response_cache import get_property_response_cache
+from search_index import get_search_index
+
+
+# (property_id, document after the write or None for a delete, document before or None for an insert)
+PropertyWrite = tuple[str, Optional[dict], Optional[dict]]
+
+
+async def after_property_writes(
+    database: AsyncIOMotorDatabase, writes: list[PropertyWrite], cities_changed: bool = True
+) -> None:
+    """Propagate property writes to the listing version and the in-process read paths."""
+    if not writes:
+        return
+    await bump_collection_version(database, "properties")
+
+    get_property_response_cache().invalidate_for(doc for _, after, before in writes for doc in (before, after))
+    invalidate_properties(property_id for property_id, _, _ in writes)
+    if cities_changed:
+        invalidate_city_suggestions()
+
+    search_index = get_search_index()
+    for property_id, doc, _ in writes:
+        if search_index is not None:
+            if doc is None:
+                search_index.remove(property_id)
+            else:
+                search_index.upsert(property_id, doc["title"], doc["description"])
+        if snapshot_enabled():
+            record_property_write(property_id, doc)
+
+
+async def after_property_write(
+    database: AsyncIOMotorDatabase,
+    property_id: str,
+    doc: Optional[dict],
+    before: Optional[dict] = None,
+    cities_changed: bool = True,
+) -> None:
+    await after_property_writes(database, [(property_id, doc, before)], cities_changed=cities_changed)
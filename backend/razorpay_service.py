@@ -1,53 +1,147 @@
+import asyncio
+import hashlib
+import hmac
+import logging
 import os
 from typing import Optional
 
-import razorpay
+import httpx
 from fastapi import HTTPException, status
 
 
+logger = logging.getLogger(__name__)
+
+RAZORPAY_API_BASE = "https://api.razorpay.com/v1"
+
+# Responses worth retrying on calls that are safe to repeat
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Failures that happen before the request reaches Razorpay, so even a
+# non-idempotent call can be retried without risking a duplicate
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
 class RazorpayService:
-    def __init__(self) -> None:
+    """Async Razorpay REST client sharing one pooled keep-alive connection set.
+
+    ``base_url`` (``RAZORPAY_API_BASE``) can point at a local stub server, and
+    ``transport`` accepts any ``httpx`` transport for in-process fakes.
+    """
+
+    def __init__(
+        self,
+        key_id: str,
+        key_secret: str,
+        base_url: str = RAZORPAY_API_BASE,
+        timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        max_retries: int = 2,
+        backoff_seconds: float = 0.2,
+        max_connections: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.key_id = key_id
+        self._key_secret = key_secret
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            auth=(key_id, key_secret),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls) -> "RazorpayService":
         key_id = os.environ.get("RAZORPAY_KEY_ID")
         key_secret = os.environ.get("RAZORPAY_KEY_SECRET")
         if not key_id or not key_secret:
             raise RuntimeError("Razorpay keys not configured in environment")
-        self.key_id = key_id
-        self.client = razorpay.Client(auth=(key_id, key_secret))
-
-    def create_order(self, amount: float, receipt: str, notes: Optional[dict] = None) -> dict:
-        try:
-            # Razorpay expects amount in paise
-            order_amount = int(amount * 100)
-            order_currency = "INR"
-            order = self.client.order.create(
-                {
-                    "amount": order_amount,
-                    "currency": order_currency,
-                    "receipt": receipt,
-                    "notes": notes or {},
-                }
-            )
-            return order
-        except Exception as e:  # noqa: BLE001
+        return cls(
+            key_id,
+            key_secret,
+            base_url=os.environ.get("RAZORPAY_API_BASE", RAZORPAY_API_BASE),
+            timeout=float(os.environ.get("RAZORPAY_TIMEOUT_SECONDS", 10)),
+            connect_timeout=float(os.environ.get("RAZORPAY_CONNECT_TIMEOUT_SECONDS", 3)),
+            max_retries=int(os.environ.get("RAZORPAY_MAX_RETRIES", 2)),
+            max_connections=int(os.environ.get("RAZORPAY_MAX_CONNECTIONS", 20)),
+        )
+
+    async def _request(self, method: str, path: str, idempotent: bool, **kwargs) -> dict:
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                response = await self._client.request(method, path, **kwargs)
+                if not (idempotent and response.status_code in _RETRY_STATUSES and attempt < self.max_retries):
+                    response.raise_for_status()
+                    return response.json()
+                reason = f"HTTP {response.status_code}"
+            except _NOT_SENT_ERRORS as e:
+                if attempt >= self.max_retries:
+                    return self._fail(method, path, e)
+                reason = type(e).__name__
+            except httpx.TransportError as e:
+                # Sent but no answer: only safe to repeat when idempotent
+                if not idempotent or attempt >= self.max_retries:
+                    return self._fail(method, path, e)
+                reason = type(e).__name__
+            except httpx.HTTPStatusError as e:
+                return self._fail(method, path, e)
+
+            attempt += 1
+            self.retries += 1
+            delay = self.backoff_seconds * 2 ** (attempt - 1)
+            logger.warning("Razorpay %s %s failed (%s); retry %d in %.2fs", method, path, reason, attempt, delay)
+            await asyncio.sleep(delay)
+
+    def _fail(self, method: str, path: str, error: Exception) -> dict:
+        self.failures += 1
+        if isinstance(error, httpx.TimeoutException):
             raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail=f"Error creating Razorpay order: {e}",
-            ) from e
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=f"Razorpay {method} {path} timed out",
+            ) from error
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Error calling Razorpay {method} {path}: {error}",
+        ) from error
+
+    async def create_order(self, amount: float, receipt: str, notes: Optional[dict] = None) -> dict:
+        # Razorpay expects amount in paise
+        body = {
+            "amount": int(amount * 100),
+            "currency": "INR",
+            "receipt": receipt,
+            "notes": notes or {},
+        }
+        return await self._request("POST", "/orders", idempotent=False, json=body)
+
+    async def fetch_order(self, order_id: str) -> dict:
+        return await self._request("GET", f"/orders/{order_id}", idempotent=True)
+
+    async def fetch_order_payments(self, order_id: str) -> list[dict]:
+        payload = await self._request("GET", f"/orders/{order_id}/payments", idempotent=True)
+        return payload.get("items", [])
 
     def verify_signature(self, razorpay_order_id: str, razorpay_payment_id: str, razorpay_signature: str) -> bool:
-        try:
-            params_dict = {
-                "razorpay_order_id": razorpay_order_id,
-                "razorpay_payment_id": razorpay_payment_id,
-                "razorpay_signature": razorpay_signature,
-            }
-            self.client.utility.verify_payment_signature(params_dict)
-            return True
-        except razorpay.errors.SignatureVerificationError:  # type: ignore[attr-defined]
+        message = f"{razorpay_order_id}|{razorpay_payment_id}".encode()
+        expected = hmac.new(self._key_secret.encode(), message, hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, razorpay_signature):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Razorpay signature verification failed",
             )
+        return True
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "retries": self.retries, "failures": self.failures}
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
 
 
 _razorpay_service: Optional[RazorpayService] = None
@@ -56,5 +150,18 @@ _razorpay_service: Optional[RazorpayService] = None
 def get_razorpay_service() -> RazorpayService:
     global _razorpay_service
     if _razorpay_service is None:
-        _razorpay_service = RazorpayService()
+        _razorpay_service = RazorpayService.from_env()
     return _razorpay_service
+
+
+def set_razorpay_service(service: Optional[RazorpayService]) -> None:
+    """Swap the process-wide client, e.g. for one bound to a stub transport."""
+    global _razorpay_service
+    _razorpay_service = service
+
+
+async def close_razorpay_service() -> None:
+    global _razorpay_service
+    if _razorpay_service is not None:
+        await _razorpay_service.aclose()
+        _razorpay_service = None
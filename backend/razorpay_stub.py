@@ -0,0 +1,67 @@
+"""Minimal local stand-in for the Razorpay orders API.
+
+Run ``uvicorn razorpay_stub:app --port 9100`` and start the backend with
+``RAZORPAY_API_BASE=http://localhost:9100/v1`` to exercise checkout without
+network access. ``POST /v1/_stub/orders/{id}/pay`` marks an order as paid.
+"""
+from __future__ import annotations
+
+import time
+import uuid
+
+from fastapi import FastAPI, HTTPException
+
+
+app = FastAPI(title="Razorpay stub")
+
+_orders: dict[str, dict] = {}
+_payments: dict[str, list[dict]] = {}
+
+
+@app.post("/v1/orders")
+async def create_order(body: dict):
+    order = {
+        "id": f"order_{uuid.uuid4().hex[:14]}",
+        "entity": "order",
+        "amount": body["amount"],
+        "amount_paid": 0,
+        "amount_due": body["amount"],
+        "currency": body.get("currency", "INR"),
+        "receipt": body.get("receipt"),
+        "status": "created",
+        "notes": body.get("notes", {}),
+        "created_at": int(time.time()),
+    }
+    _orders[order["id"]] = order
+    _payments[order["id"]] = []
+    return order
+
+
+@app.get("/v1/orders/{order_id}")
+async def fetch_order(order_id: str):
+    if order_id not in _orders:
+        raise HTTPException(status_code=400, detail="The id provided does not exist")
+    return _orders[order_id]
+
+
+@app.get("/v1/orders/{order_id}/payments")
+async def fetch_order_payments(order_id: str):
+    items = _payments.get(order_id, [])
+    return {"entity": "collection", "count": len(items), "items": items}
+
+
+@app.post("/v1/_stub/orders/{order_id}/pay")
+async def pay_order(order_id: str):
+    order = await fetch_order(order_id)
+    payment = {
+        "id": f"pay_{uuid.uuid4().hex[:14]}",
+        "entity": "payment",
+        "order_id": order_id,
+        "amount": order["amount"],
+        "currency": order["currency"],
+        "status": "captured",
+        "created_at": int(time.time()),
+    }
+    _payments[order_id].append(payment)
+    order.update(status="paid", amount_paid=order["amount"], amount_due=0)
+    return payment
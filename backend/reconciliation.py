@@ -0,0 +1,205 @@
+"""Reconcile booking leads whose payment was never verified.
+
+Stale ``new`` / ``in_progress`` booking leads are paged through the
+``(type, status, created_at, id)`` index. The gateway is asked about each order
+with at most ``RECONCILE_CONCURRENCY`` calls in flight. Paid orders are
+completed in one ``bulk_write`` per page, and orders that stayed unpaid past
+``RECONCILE_CANCEL_AFTER_HOURS`` are cancelled. Run it once with
+``python reconciliation.py``; the server also runs it every
+``RECONCILE_INTERVAL_SECONDS`` when Razorpay is configured.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from razorpay_service import RazorpayService
+from webhooks import settle_paid_orders
+
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = ["new", "in_progress"]
+
+
+class ReconcileStats:
+    def __init__(self) -> None:
+        self.runs = 0
+        self.running = False
+        self.scanned = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.unchanged = 0
+        self.errors = 0
+        self.last_started_at: Optional[datetime] = None
+        self.last_duration_seconds: Optional[float] = None
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "running": self.running,
+            "scanned": self.scanned,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "unchanged": self.unchanged,
+            "errors": self.errors,
+            "last_started_at": self.last_started_at,
+            "last_duration_seconds": self.last_duration_seconds,
+        }
+
+
+reconcile_stats = ReconcileStats()
+
+
+async def _order_outcome(gateway: RazorpayService, lead: dict, cancel_before: datetime) -> tuple[str, Optional[str]]:
+    """``("paid", payment_id)``, ``("cancel", None)`` or ``("wait", None)`` for one lead."""
+    order = await gateway.fetch_order(lead["razorpay_order_id"])
+    if order.get("status") == "paid":
+        payments = await gateway.fetch_order_payments(lead["razorpay_order_id"])
+        captured = next((p["id"] for p in payments if p.get("status") == "captured"), None)
+        return "paid", captured
+    created_at = lead["created_at"]
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return ("cancel", None) if created_at < cancel_before else ("wait", None)
+
+
+async def reconcile_stale_bookings(
+    database: AsyncIOMotorDatabase,
+    gateway: RazorpayService,
+    stale_after: timedelta = timedelta(minutes=30),
+    cancel_after: timedelta = timedelta(hours=24),
+    batch_size: int = 200,
+    concurrency: int = 8,
+) -> dict:
+    now = datetime.now(timezone.utc)
+    cancel_before = now - cancel_after
+    query = {
+        "type": "booking",
+        "status": {"$in": PENDING_STATUSES},
+        "created_at": {"$lt": now - stale_after},
+        "razorpay_order_id": {"$ne": None},
+    }
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def check(lead: dict) -> tuple[str, Optional[str]]:
+        async with semaphore:
+            try:
+                return await _order_outcome(gateway, lead, cancel_before)
+            except HTTPException as e:
+                logger.warning("Reconciling lead %s failed: %s", lead["id"], e.detail)
+                return "error", None
+
+    started = time.monotonic()
+    reconcile_stats.runs += 1
+    reconcile_stats.running = True
+    reconcile_stats.last_started_at = now
+    totals = {"scanned": 0, "completed": 0, "cancelled": 0, "unchanged": 0, "errors": 0}
+    last: Optional[tuple[datetime, str]] = None
+    try:
+        while True:
+            page_query = dict(query)
+            if last is not None:
+                # Keyset paging in index order; rows settled meanwhile simply drop out
+                page_query["$or"] = [
+                    {"created_at": {"$gt": last[0]}},
+                    {"created_at": last[0], "id": {"$gt": last[1]}},
+                ]
+            leads = await (
+                database.leads.find(page_query, {"_id": 0, "id": 1, "razorpay_order_id": 1, "created_at": 1})
+                .sort([("created_at", 1), ("id", 1)])
+                .limit(batch_size)
+                .to_list(batch_size)
+            )
+            if not leads:
+                break
+            last = (leads[-1]["created_at"], leads[-1]["id"])
+
+            outcomes = await asyncio.gather(*(check(lead) for lead in leads))
+            paid = {
+                lead["razorpay_order_id"]: (payment_id, "reconciliation")
+                for lead, (outcome, payment_id) in zip(leads, outcomes)
+                if outcome == "paid"
+            }
+            to_cancel = [lead["id"] for lead, (outcome, _) in zip(leads, outcomes) if outcome == "cancel"]
+
+            completed = len(await settle_paid_orders(database, paid))
+            cancelled = 0
+            if to_cancel:
+                result = await database.leads.bulk_write(
+                    [
+                        UpdateOne(
+                            {"id": lead_id, "status": {"$in": PENDING_STATUSES}},
+                            {"$set": {"status": "cancelled", "updated_at": datetime.now(timezone.utc)}},
+                        )
+                        for lead_id in to_cancel
+                    ],
+                    ordered=False,
+                )
+                cancelled = result.modified_count
+
+            page = {
+                "scanned": len(leads),
+                "completed": completed,
+                "cancelled": cancelled,
+                "errors": sum(1 for outcome, _ in outcomes if outcome == "error"),
+            }
+            page["unchanged"] = page["scanned"] - completed - cancelled - page["errors"]
+            for key, value in page.items():
+                totals[key] += value
+                setattr(reconcile_stats, key, getattr(reconcile_stats, key) + value)
+            logger.info("Reconciliation progress: %s", totals)
+    finally:
+        reconcile_stats.running = False
+        reconcile_stats.last_duration_seconds = round(time.monotonic() - started, 3)
+    return totals
+
+
+def _settings_from_env() -> dict:
+    return {
+        "stale_after": timedelta(minutes=float(os.environ.get("RECONCILE_STALE_MINUTES", 30))),
+        "cancel_after": timedelta(hours=float(os.environ.get("RECONCILE_CANCEL_AFTER_HOURS", 24))),
+        "batch_size": int(os.environ.get("RECONCILE_BATCH_SIZE", 200)),
+        "concurrency": int(os.environ.get("RECONCILE_CONCURRENCY", 8)),
+    }
+
+
+def reconciliation_interval() -> float:
+    return float(os.environ.get("RECONCILE_INTERVAL_SECONDS", 600))
+
+
+async def run_reconciliation(database: AsyncIOMotorDatabase, gateway: RazorpayService) -> None:
+    """Reconcile every ``RECONCILE_INTERVAL_SECONDS`` until cancelled."""
+    while True:
+        try:
+            await reconcile_stale_bookings(database, gateway, **_settings_from_env())
+        except Exception:  # noqa: BLE001
+            logger.exception("Payment reconciliation run failed")
+        await asyncio.sleep(reconciliation_interval())
+
+
+async def _main() -> None:
+    from db import db, close_db_client
+    from razorpay_service import close_razorpay_service, get_razorpay_service
+
+    try:
+        totals = await reconcile_stale_bookings(db, get_razorpay_service(), **_settings_from_env())
+        print(", ".join(f"{key}: {value}" for key, value in totals.items()))
+    finally:
+        await close_razorpay_service()
+        await close_db_client()
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Reconcile stale booking leads against Razorpay").parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
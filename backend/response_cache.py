@@ -0,0 +1,173 @@
+"""Read-through cache of pre-serialized responses for the public property routes.
+
+Entries hold the final JSON bytes and are bounded by total body size. Each
+entry carries an ``affected_by`` predicate so a property write only evicts
+the listings and detail pages it can change. With a non-zero
+``RESPONSE_CACHE_STALE_SECONDS`` an expired entry is served once more while
+a background task reloads it (stale-while-revalidate). A load that overlaps
+an invalidation is returned but not stored, since it may predate the write.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Hashable, Iterable, Optional
+
+from fastapi import Response
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    headers: dict[str, str] = field(default_factory=dict)
+    affected_by: Callable[[dict], bool] = lambda doc: True
+    last_modified: Optional[datetime] = None
+    expires_at: float = 0.0
+    stale_until: float = 0.0
+
+    def to_response(self) -> Response:
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
+
+
+Loader = Callable[[], Awaitable[CachedResponse]]
+
+
+class ResponseCache:
+    def __init__(self, ttl_seconds: float = 30.0, stale_seconds: float = 0.0, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._refreshing: set[Hashable] = set()
+        # Bumped by every invalidation; a load only stores its result if this did not change meanwhile
+        self._generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _store(self, key: Hashable, entry: CachedResponse) -> None:
+        now = time.monotonic()
+        entry.expires_at = now + self.ttl_seconds
+        entry.stale_until = entry.expires_at + self.stale_seconds
+        self._drop(key)
+        if len(entry.body) > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += len(entry.body)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+            self.evictions += 1
+
+    def _drop(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= len(entry.body)
+        return True
+
+    def _store_unless_invalidated(self, key: Hashable, entry: CachedResponse, generation: int) -> None:
+        if generation == self._generation:
+            self._store(key, entry)
+        else:
+            self._drop(key)
+
+    async def _refresh(self, key: Hashable, loader: Loader) -> None:
+        generation = self._generation
+        try:
+            self._store_unless_invalidated(key, await loader(), generation)
+        except Exception:  # noqa: BLE001
+            logger.exception("Background refresh of cached response %r failed", key)
+            self._drop(key)
+        finally:
+            self._refreshing.discard(key)
+
+    def peek(self, key: Hashable) -> Optional[CachedResponse]:
+        """The fresh entry for ``key`` without touching LRU order or counters."""
+        entry = self._entries.get(key) if self.enabled else None
+        if entry is None or time.monotonic() >= entry.expires_at:
+            return None
+        return entry
+
+    async def fetch(self, key: Hashable, loader: Loader) -> Response:
+        if not self.enabled:
+            return (await loader()).to_response()
+
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            if now < entry.expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.to_response()
+            if now < entry.stale_until:
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    asyncio.create_task(self._refresh(key, loader))
+                return entry.to_response()
+
+        self.misses += 1
+        generation = self._generation
+        entry = await loader()
+        self._store_unless_invalidated(key, entry, generation)
+        return entry.to_response()
+
+    def invalidate_for(self, docs: Iterable[Optional[dict]]) -> int:
+        """Evict every entry whose content can change when any of ``docs`` is written."""
+        docs = [doc for doc in docs if doc]
+        self._generation += 1
+        keys = [key for key, entry in self._entries.items() if any(entry.affected_by(doc) for doc in docs)]
+        for key in keys:
+            self._drop(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+_property_response_cache: Optional[ResponseCache] = None
+
+
+def get_property_response_cache() -> ResponseCache:
+    global _property_response_cache
+    if _property_response_cache is None:
+        _property_response_cache = ResponseCache(
+            ttl_seconds=float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", 30)),
+            stale_seconds=float(os.environ.get("RESPONSE_CACHE_STALE_SECONDS", 0)),
+            max_bytes=int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024)),
+        )
+    return _property_response_cache
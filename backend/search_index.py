@@ -0,0 +1,141 @@
+"""In-process inverted index over property titles and descriptions.
+
+Used for ``GET /api/properties?q=`` when ``PROPERTY_SEARCH_BACKEND=memory``
+(deployments without Mongo text indexes). It is built at startup, kept
+current by this process's property writes (see property_writes.py) and
+rebuilt every ``PROPERTY_SEARCH_REBUILD_SECONDS`` to pick up writes made by
+other workers, the CLI or migrations.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+from collections import defaultdict
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset({"a", "an", "and", "at", "for", "in", "of", "on", "or", "the", "to", "with"})
+
+TITLE_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.casefold()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+class InvertedIndex:
+    def __init__(self) -> None:
+        self._postings: dict[str, dict[str, int]] = defaultdict(dict)
+        self._doc_terms: dict[str, dict[str, int]] = {}
+        # Local writes made while a rebuild is loading, replayed before the swap
+        self._pending: Optional[list[tuple[str, Optional[str], Optional[str]]]] = None
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def upsert(self, doc_id: str, title: str, description: str) -> None:
+        if self._pending is not None:
+            self._pending.append((doc_id, title, description))
+        self._remove(doc_id)
+        terms: dict[str, int] = defaultdict(int)
+        for token in tokenize(title):
+            terms[token] += TITLE_WEIGHT
+        for token in tokenize(description):
+            terms[token] += DESCRIPTION_WEIGHT
+        for token, weight in terms.items():
+            self._postings[token][doc_id] = weight
+        self._doc_terms[doc_id] = dict(terms)
+
+    def remove(self, doc_id: str) -> None:
+        if self._pending is not None:
+            self._pending.append((doc_id, None, None))
+        self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        for token in self._doc_terms.pop(doc_id, {}):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[token]
+
+    def search(self, q: str, limit: int = 1000) -> list[str]:
+        """Ids matching any query term, best-scoring first."""
+        scores: dict[str, int] = defaultdict(int)
+        for token in set(tokenize(q)):
+            for doc_id, weight in self._postings.get(token, {}).items():
+                scores[doc_id] += weight
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [doc_id for doc_id, _ in ranked[:limit]]
+
+    async def rebuild(self, database: AsyncIOMotorDatabase) -> int:
+        """Reload from Mongo into a fresh index and swap it in; searches keep using the old one meanwhile."""
+        fresh = InvertedIndex()
+        self._pending = []
+        try:
+            async for doc in database.properties.find({}, {"_id": 0, "id": 1, "title": 1, "description": 1}):
+                fresh.upsert(doc["id"], doc.get("title") or "", doc.get("description") or "")
+            for doc_id, title, description in self._pending:
+                if title is None:
+                    fresh.remove(doc_id)
+                else:
+                    fresh.upsert(doc_id, title, description)
+        finally:
+            self._pending = None
+        self._postings, self._doc_terms = fresh._postings, fresh._doc_terms
+        return len(self)
+
+    def stats(self) -> dict:
+        return {"documents": len(self._doc_terms), "terms": len(self._postings)}
+
+
+_search_index: Optional[InvertedIndex] = None
+
+
+def get_search_index() -> Optional[InvertedIndex]:
+    """The in-process index, or ``None`` when searching through Mongo ``$text``."""
+    global _search_index
+    if _search_index is None and os.environ.get("PROPERTY_SEARCH_BACKEND", "mongo").lower() == "memory":
+        _search_index = InvertedIndex()
+    return _search_index
+
+
+async def run_search_index_rebuild(database: AsyncIOMotorDatabase) -> None:
+    interval = float(os.environ.get("PROPERTY_SEARCH_REBUILD_SECONDS", 300))
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await get_search_index().rebuild(database)
+        except Exception:  # noqa: BLE001
+            logger.exception("Search index rebuild failed; keeping the previous index")
+
+
+async def search_properties(
+    database: AsyncIOMotorDatabase, query: dict, q: str, limit: int, projection: Optional[dict] = None
+) -> list[dict]:
+    """Filtered property documents matching ``q``, most relevant first."""
+    projection = projection or {"_id": 0}
+    search_index = get_search_index()
+    if search_index is None:
+        return await (
+            database.properties.find({**query, "$text": {"$search": q}}, {**projection, "score": {"$meta": "textScore"}})
+            .sort([("score", {"$meta": "textScore"})])
+            .limit(limit)
+            .to_list(limit)
+        )
+
+    ranked_ids = search_index.search(q)
+    if not ranked_ids:
+        return []
+    docs = await database.properties.find({**query, "id": {"$in": ranked_ids}}, projection).to_list(len(ranked_ids))
+    rank = {property_id: position for position, property_id in enumerate(ranked_ids)}
+    docs.sort(key=lambda doc: rank[doc["id"]])
+    return docs[:limit]
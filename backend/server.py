@@ -1,14 +1,17 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+import asyncio
 import os
 import logging
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime, timezone
 
-from db import db, get_db, close_db_client
+from db import client, db, get_db, close_db_client
 from models import (
     UserCreate,
     UserRegister,
@@ -23,6 +26,12 @@ from models import (
     PropertyUpdate,
     PropertyInDB,
     PropertyPublic,
+    PropertySearchResult,
+    PropertyBatchRequest,
+    PropertyBatchResult,
+    PropertyBulkUpdate,
+    BulkPropertyReport,
+    normalize_city,
     LeadCreate,
     LeadInDB,
     LeadPublic,
@@ -37,13 +46,57 @@ from models import (
     RazorpayVerifyRequest,
 )
 from auth import (
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
     create_access_token,
     get_current_active_user,
+    invalidate_cached_user,
+    user_cache,
     user_to_public,
 )
-from razorpay_service import get_razorpay_service
+from razorpay_service import close_razorpay_service, get_razorpay_service
+from hashing import get_hashing_executor, shutdown_hashing_executor
+from indexes import ensure_indexes
+from pagination import KEYSET_SORT, keyset_filter, split_page
+from migrations import run_migrations
+from cities import city_cache_stats, suggest_cities
+from search_index import get_search_index, run_search_index_rebuild, search_properties
+from facets import property_facets
+from property_filters import PropertyFilter, property_filters
+from property_snapshot import get_property_snapshot, resync_property_snapshot, run_snapshot_resync, snapshot_enabled
+from response_cache import CachedResponse, get_property_response_cache
+from singleflight import read_flight
+from mutations import property_write_scope, raise_not_found_or_forbidden
+from bulk_import import BulkInsert, BulkUpdate, iter_rows
+from property_writes import after_property_write
+from exports import ExportFormat, export_fields, export_response, export_scope
+from webhooks import get_webhook_processor, verify_webhook_signature
+from reconciliation import reconcile_stats, reconciliation_interval, run_reconciliation
+from idempotency import idempotency_stats, run_idempotent
+from slow_queries import get_slow_query_monitor
+from fast_json import FastJSONResponse, trusted_dump, trusted_json, trusted_json_list
+from fieldsets import FieldSet, dump_sparse_items, lead_fields, projection, property_fields, sparse_model
+from property_batch import BATCH_MAX_IDS, get_properties_by_id, property_batch_cache_stats
+from metrics import MetricsMiddleware, render_metrics
+from conditional import (
+    document_etag,
+    get_collection_version,
+    has_conditional_headers,
+    is_not_modified,
+    make_etag,
+    not_modified,
+    validator_headers,
+)
+from dashboard_stats import (
+    agent_dashboard,
+    aggregate_customer_dashboard,
+    franchise_dashboard,
+    record_booking_completed,
+    record_lead_created,
+    record_property_changed,
+    record_property_created,
+    record_property_deleted,
+)
 
 
 ROOT_DIR = Path(__file__).parent
@@ -52,8 +105,59 @@ load_dotenv(ROOT_DIR / '.env')
 # MongoDB connection handled in db.py
 
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    if os.environ.get("AUTO_CREATE_INDEXES", "true").lower() != "false":
+        try:
+            report = await ensure_indexes(db)
+            if report["created"]:
+                logger.info("Created MongoDB indexes: %s", ", ".join(report["created"]))
+            if report["failed"]:
+                logger.error("MongoDB indexes not created: %s", ", ".join(name for name, _ in report["failed"]))
+        except Exception:  # noqa: BLE001
+            logger.exception("Index provisioning failed; continuing without it")
+    if os.environ.get("RUN_MIGRATIONS_ON_STARTUP", "true").lower() != "false":
+        try:
+            applied = await run_migrations(db)
+            logger.info("Data migrations applied: %s", applied)
+        except Exception:  # noqa: BLE001
+            logger.exception("Data migrations failed; continuing without them")
+    search_index = get_search_index()
+    search_task = None
+    if search_index is not None:
+        logger.info("Indexed %d properties for in-process search", await search_index.rebuild(db))
+        search_task = asyncio.create_task(run_search_index_rebuild(db))
+    resync_task = None
+    if snapshot_enabled():
+        logger.info("Loaded %d properties into the listing snapshot", await resync_property_snapshot(db))
+        resync_task = asyncio.create_task(run_snapshot_resync(db))
+    webhook_task = asyncio.create_task(get_webhook_processor().run(db))
+    slow_query_task = None
+    if get_slow_query_monitor().enabled:
+        slow_query_task = asyncio.create_task(get_slow_query_monitor().run(client))
+    reconcile_task = None
+    if reconciliation_interval() > 0:
+        try:
+            reconcile_task = asyncio.create_task(run_reconciliation(db, get_razorpay_service()))
+        except RuntimeError:
+            logger.info("Razorpay not configured; payment reconciliation disabled")
+    yield
+    webhook_task.cancel()
+    if slow_query_task is not None:
+        slow_query_task.cancel()
+    if reconcile_task is not None:
+        reconcile_task.cancel()
+    if resync_task is not None:
+        resync_task.cancel()
+    if search_task is not None:
+        search_task.cancel()
+    shutdown_hashing_executor()
+    await close_razorpay_service()
+    await close_db_client()
+
+
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -73,7 +177,7 @@ async def register_user(payload: UserRegister, database: AsyncIOMotorDatabase =
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    password_hash = get_password_hash(payload.password)
+    password_hash = await get_password_hash_async(payload.password)
     user_in_db = UserInDB(
         email=payload.email,
         full_name=payload.full_name,
@@ -91,7 +195,7 @@ async def register_user(payload: UserRegister, database: AsyncIOMotorDatabase =
 
 async def seed_default_users(database: AsyncIOMotorDatabase) -> None:
     """Seed one Super Admin and one Admin if they do not exist."""
-    from auth import get_password_hash as _hash  # avoid circular import at module import time
+    from auth import get_password_hash_async as _hash  # avoid circular import at module import time
 
     super_admin_email = "super@golasco.com"
     admin_email = "admin@golasco.com"
@@ -103,7 +207,7 @@ async def seed_default_users(database: AsyncIOMotorDatabase) -> None:
             full_name="Default Super Admin",
             role="super_admin",
             franchise_id=None,
-            password_hash=_hash("Super@123"),
+            password_hash=await _hash("Super@123"),
             is_verified=True,
         )
         await database.users.insert_one(super_user.model_dump())
@@ -115,7 +219,7 @@ async def seed_default_users(database: AsyncIOMotorDatabase) -> None:
             full_name="Default Admin",
             role="admin",
             franchise_id="default-company",
-            password_hash=_hash("Admin@123"),
+            password_hash=await _hash("Admin@123"),
             is_verified=True,
         )
         await database.users.insert_one(admin_user.model_dump())
@@ -136,10 +240,53 @@ async def list_pending_users(
 
     pending_cursor = database.users.find({"is_verified": False}, {"_id": 0})
     pending_docs = await pending_cursor.to_list(200)
-    pending_users = [UserPublic(**doc) for doc in pending_docs]
-
     total_users = await database.users.count_documents({})
-    return SuperAdminDashboard(total_users=total_users, pending_users=pending_users)
+    return FastJSONResponse(
+        trusted_dump(SuperAdminDashboard, {"total_users": total_users, "pending_users": pending_docs})
+    )
+
+
+@api_router.get("/super-admin/runtime-stats")
+async def runtime_stats(current_user: UserInDB = Depends(get_current_active_user)):
+    if current_user.role != "super_admin":
+        raise HTTPException(status_code=403, detail="Only Super Admin can view runtime stats")
+
+    return {
+        "hashing": get_hashing_executor().stats(),
+        "user_cache": user_cache.stats(),
+        "city_suggestions": city_cache_stats(),
+        "search_index": get_search_index().stats() if get_search_index() is not None else None,
+        "property_snapshot": get_property_snapshot().stats() if get_property_snapshot() is not None else None,
+        "property_response_cache": get_property_response_cache().stats(),
+        "single_flight": read_flight.stats(),
+        "razorpay_webhooks": get_webhook_processor().stats(),
+        "payment_reconciliation": reconcile_stats.stats(),
+        "idempotency": idempotency_stats(),
+        "property_batch_cache": property_batch_cache_stats(),
+        "slow_queries": get_slow_query_monitor().stats(),
+    }
+
+
+@api_router.get("/super-admin/slow-queries")
+async def slow_queries(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """Slow Mongo operations grouped by query shape, most total time first, with sampled explain flags."""
+    if current_user.role != "super_admin":
+        raise HTTPException(status_code=403, detail="Only Super Admin can view slow queries")
+
+    monitor = get_slow_query_monitor()
+    return {**monitor.stats(), "queries": monitor.report(limit)}
+
+
+@api_router.delete("/super-admin/slow-queries")
+async def reset_slow_queries(current_user: UserInDB = Depends(get_current_active_user)):
+    if current_user.role != "super_admin":
+        raise HTTPException(status_code=403, detail="Only Super Admin can reset slow queries")
+
+    get_slow_query_monitor().reset()
+    return {"message": "Slow query statistics cleared"}
 
 
 # ---------- Dev utility: seed default users ----------
@@ -172,12 +319,16 @@ async def verify_user_request(
     if current_user.role != "super_admin":
         raise HTTPException(status_code=403, detail="Only Super Admin can verify users")
 
-    doc = await database.users.find_one({"id": user_id})
-    if not doc:
+    updated = await database.users.find_one_and_update(
+        {"id": user_id},
+        {"$set": {"is_verified": True}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not updated:
         raise HTTPException(status_code=404, detail="User not found")
 
-    await database.users.update_one({"id": user_id}, {"$set": {"is_verified": True}})
-    updated = await database.users.find_one({"id": user_id}, {"_id": 0})
+    invalidate_cached_user(user_id)
     return UserPublic(**updated)
 
 
@@ -201,9 +352,9 @@ async def dashboard_admin(
     company_id = current_user.franchise_id
     members_cursor = database.users.find({"franchise_id": company_id}, {"_id": 0}) if company_id else []
     members_docs = await members_cursor.to_list(200) if company_id else []
-    members = [UserPublic(**doc) for doc in members_docs]
-
-    return AdminDashboardModel(company_id=company_id, team_members=members)
+    return FastJSONResponse(
+        trusted_dump(AdminDashboardModel, {"company_id": company_id, "team_members": members_docs})
+    )
 
 
 @api_router.get("/dashboard/super-admin", response_model=SuperAdminDashboard)
@@ -216,10 +367,10 @@ async def dashboard_super_admin(
 
     pending_cursor = database.users.find({"is_verified": False}, {"_id": 0})
     pending_docs = await pending_cursor.to_list(200)
-    pending_users = [UserPublic(**doc) for doc in pending_docs]
-
     total_users = await database.users.count_documents({})
-    return SuperAdminDashboard(total_users=total_users, pending_users=pending_users)
+    return FastJSONResponse(
+        trusted_dump(SuperAdminDashboard, {"total_users": total_users, "pending_users": pending_docs})
+    )
 
 
 # Startup event removed
@@ -232,7 +383,7 @@ async def login_user(payload: UserLogin, database: AsyncIOMotorDatabase = Depend
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
 
     user = UserInDB(**doc)
-    if not verify_password(payload.password, user.password_hash):
+    if not await verify_password_async(payload.password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
 
     # Only super admin can bypass verification
@@ -281,34 +432,196 @@ async def create_property(
 
     prop = PropertyInDB(**payload.model_dump(), franchise_id=franchise_id)
     await database.properties.insert_one(prop.model_dump())
+    await record_property_created(database, prop.model_dump())
+    await after_property_write(database, prop.id, prop.model_dump())
     return PropertyPublic(**prop.model_dump())
 
 
+@api_router.post("/properties/bulk", response_model=BulkPropertyReport)
+async def bulk_properties(
+    request: Request,
+    op: Literal["insert", "update"] = "insert",
+    ordered: bool = False,
+    current_user: UserInDB = Depends(get_current_active_user),
+    database: AsyncIOMotorDatabase = Depends(get_db),
+):
+    """Insert listings, or update their status/price, from a JSON array, NDJSON or CSV body.
+
+    Rows are validated one by one and written in ``bulk_write`` chunks. With
+    ``ordered=true`` processing stops at the first failing row.
+    """
+    if current_user.role not in {"agent", "franchise_owner"}:
+        raise HTTPException(status_code=403, detail="Not allowed to import properties")
+
+    if op == "insert":
+        if not current_user.franchise_id:
+            raise HTTPException(status_code=400, detail="User is not linked to a franchise")
+        bulk = BulkInsert(database, current_user.franchise_id, ordered)
+        return await bulk.run(iter_rows(request), PropertyCreate)
+
+    bulk = BulkUpdate(database, property_write_scope(current_user), ordered)
+    return await bulk.run(iter_rows(request), PropertyBulkUpdate)
+
+
+@api_router.post("/properties/batch", response_model=PropertyBatchResult)
+async def get_properties_batch(
+    payload: PropertyBatchRequest,
+    fields: FieldSet = Depends(property_fields),
+    database: AsyncIOMotorDatabase = Depends(get_db),
+):
+    """Resolve many properties by id in one ``$in`` query; unknown ids are listed in ``missing``."""
+    if len(payload.ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} ids per request")
+
+    docs, missing = await get_properties_by_id(database, payload.ids)
+    data = {"items": docs, "missing": missing}
+    return FastJSONResponse(dump_sparse_items(PropertyBatchResult, data, "items", PropertyPublic, fields))
+
+
 @api_router.get("/properties", response_model=List[PropertyPublic])
 async def list_properties(
-    city: Optional[str] = None,
-    type: Optional[str] = None,
-    max_price: Optional[float] = None,
+    request: Request,
+    flt: PropertyFilter = Depends(property_filters),
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=200),
+    fields: FieldSet = Depends(property_fields),
+    database: AsyncIOMotorDatabase = Depends(get_db),
+):
+    """Newest-first property listing with keyset pagination.
+
+    The next page's cursor is returned in the ``X-Next-Cursor`` header (and as a
+    ``Link: rel="next"`` URL) so the body stays a plain list. With ``q`` the
+    results are instead a single page ranked by text relevance. Responses are
+    served from the property response cache and carry an ETag derived from the
+    properties collection version, so unchanged polls get a 304. The version
+    is only read from Mongo on a cache miss, or for a conditional request
+    with nothing cached. ``fields`` limits both what is read from Mongo and
+    what is returned.
+    """
+    if q and cursor:
+        raise HTTPException(status_code=400, detail="Cursor pagination is not supported for text search")
+
+    cache = get_property_response_cache()
+    key = ("list", flt, q, cursor, limit, fields)
+
+    read: Optional[tuple[str, Optional[datetime]]] = None
+
+    async def validators() -> tuple[str, Optional[datetime]]:
+        nonlocal read
+        if read is None:
+            version, last_modified = await read_flight.do(
+                ("collection_version", "properties"), lambda: get_collection_version(database, "properties")
+            )
+            read = make_etag("properties", version, key), last_modified
+        return read
+
+    if has_conditional_headers(request):
+        cached = cache.peek(key)
+        if cached is not None:
+            etag, last_modified = cached.headers["ETag"], cached.last_modified
+        else:
+            etag, last_modified = await validators()
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+
+    async def load() -> CachedResponse:
+        etag, last_modified = await validators()
+        headers = validator_headers(etag, last_modified)
+        if q:
+            docs = await read_flight.do(
+                ("property_search", flt, q, limit, fields),
+                lambda: search_properties(database, flt.mongo_query(), q, limit, projection(fields)),
+            )
+        else:
+            snapshot = get_property_snapshot()
+            if snapshot is not None:
+                docs = snapshot.query(flt, limit, cursor)
+            else:
+                docs = await read_flight.do(
+                    ("property_list", flt, cursor, limit, fields),
+                    lambda: database.properties.find(
+                        keyset_filter(flt.mongo_query(), cursor), projection(fields, extra=["created_at"])
+                    )
+                    .sort(KEYSET_SORT)
+                    .limit(limit + 1)
+                    .to_list(limit + 1),
+                )
+            docs, next_cursor = split_page(docs, limit)
+            if next_cursor:
+                next_url = request.url.include_query_params(cursor=next_cursor)
+                headers["X-Next-Cursor"] = next_cursor
+                headers["Link"] = f'<{next_url.path}?{next_url.query}>; rel="next"'
+        body = trusted_json_list(sparse_model(PropertyPublic, fields), docs)
+        return CachedResponse(body=body, headers=headers, affected_by=flt.matches, last_modified=last_modified)
+
+    return await cache.fetch(key, load)
+
+
+@api_router.get("/properties/facets", response_model=PropertySearchResult)
+async def list_property_facets(
+    flt: PropertyFilter = Depends(property_filters),
+    q: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     database: AsyncIOMotorDatabase = Depends(get_db),
 ):
-    query: dict = {}
-    if city:
-        query["city"] = {"$regex": city, "$options": "i"}
-    if type:
-        query["property_type"] = type
-    if max_price is not None:
-        query["price"] = {"$lte": max_price}
+    """First page of ``list_properties`` plus city/type/status/price counts in one aggregation."""
+    docs, facets = await property_facets(database, flt.mongo_query(), q, limit)
+    return PropertySearchResult(items=[PropertyPublic(**doc) for doc in docs], facets=facets)
 
-    docs = await database.properties.find(query, {"_id": 0}).to_list(200)
-    return [PropertyPublic(**doc) for doc in docs]
+
+@api_router.get("/properties/cities", response_model=List[str])
+async def list_property_cities(
+    prefix: str = "",
+    limit: int = Query(10, ge=1, le=100),
+    database: AsyncIOMotorDatabase = Depends(get_db),
+):
+    """City autocomplete served from a cached list of distinct cities."""
+    return await suggest_cities(database, prefix, limit)
 
 
 @api_router.get("/properties/{property_id}", response_model=PropertyPublic)
-async def get_property(property_id: str, database: AsyncIOMotorDatabase = Depends(get_db)):
-    doc = await database.properties.find_one({"id": property_id}, {"_id": 0})
-    if not doc:
-        raise HTTPException(status_code=404, detail="Property not found")
-    return PropertyPublic(**doc)
+async def get_property(
+    property_id: str,
+    request: Request,
+    fields: FieldSet = Depends(property_fields),
+    database: AsyncIOMotorDatabase = Depends(get_db),
+):
+    cache = get_property_response_cache()
+    key = ("detail", property_id, fields)
+    variant = (fields,) if fields else ()
+
+    if has_conditional_headers(request):
+        cached = cache.peek(key)
+        if cached is not None:
+            etag, last_modified = cached.headers["ETag"], cached.last_modified
+        else:
+            # Validators only need updated_at, so skip reading and serializing the body
+            stamp = await read_flight.do(
+                ("property_stamp", property_id),
+                lambda: database.properties.find_one({"id": property_id}, {"_id": 0, "updated_at": 1}),
+            )
+            if stamp is None:
+                raise HTTPException(status_code=404, detail="Property not found")
+            etag, last_modified = document_etag(property_id, stamp["updated_at"], *variant), stamp["updated_at"]
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+
+    async def load() -> CachedResponse:
+        doc = await read_flight.do(
+            ("property", property_id, fields),
+            lambda: database.properties.find_one({"id": property_id}, projection(fields, extra=["updated_at"])),
+        )
+        if not doc:
+            raise HTTPException(status_code=404, detail="Property not found")
+        return CachedResponse(
+            body=trusted_json(sparse_model(PropertyPublic, fields), doc),
+            headers=validator_headers(document_etag(property_id, doc["updated_at"], *variant), doc["updated_at"]),
+            affected_by=lambda changed: changed.get("id") == property_id,
+            last_modified=doc["updated_at"],
+        )
+
+    return await cache.fetch(key, load)
 
 
 @api_router.put("/properties/{property_id}", response_model=PropertyPublic)
@@ -318,21 +631,30 @@ async def update_property(
     current_user: UserInDB = Depends(get_current_active_user),
     database: AsyncIOMotorDatabase = Depends(get_db),
 ):
-    doc = await database.properties.find_one({"id": property_id})
-    if not doc:
-        raise HTTPException(status_code=404, detail="Property not found")
-
-    prop = PropertyInDB(**doc)
-    if current_user.role == "agent" and prop.assigned_agent_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not allowed to edit this property")
-    if current_user.role == "franchise_owner" and prop.franchise_id != (current_user.franchise_id or ""):
-        raise HTTPException(status_code=403, detail="Not allowed to edit this property")
-
+    scope = property_write_scope(current_user)
     update_data = {k: v for k, v in payload.model_dump(exclude_unset=True).items()}
+    if update_data.get("city"):
+        update_data["city_key"] = normalize_city(update_data["city"])
     update_data["updated_at"] = datetime.now(timezone.utc)
-    await database.properties.update_one({"id": property_id}, {"$set": update_data})
 
-    updated = await database.properties.find_one({"id": property_id}, {"_id": 0})
+    # One round trip: the pre-image gives both the stats transition and the new document
+    doc = await database.properties.find_one_and_update(
+        {"id": property_id, **scope},
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if doc is None:
+        await raise_not_found_or_forbidden(
+            database.properties, property_id, "Property not found", "Not allowed to edit this property"
+        )
+
+    prop = PropertyInDB(**doc)
+    updated = PropertyInDB(**{**doc, **update_data}).model_dump()
+    await record_property_changed(database, prop.model_dump(), update_data)
+    await after_property_write(
+        database, property_id, updated, before=prop.model_dump(), cities_changed="city_key" in update_data
+    )
     return PropertyPublic(**updated)
 
 
@@ -342,15 +664,19 @@ async def delete_property(
     current_user: UserInDB = Depends(get_current_active_user),
     database: AsyncIOMotorDatabase = Depends(get_db),
 ):
-    doc = await database.properties.find_one({"id": property_id})
-    if not doc:
-        raise HTTPException(status_code=404, detail="Property not found")
+    doc = None
+    if current_user.role == "franchise_owner":
+        doc = await database.properties.find_one_and_delete(
+            {"id": property_id, "franchise_id": current_user.franchise_id or ""}, projection={"_id": 0}
+        )
+    if doc is None:
+        await raise_not_found_or_forbidden(
+            database.properties, property_id, "Property not found", "Not allowed to delete this property"
+        )
 
     prop = PropertyInDB(**doc)
-    if current_user.role != "franchise_owner" or prop.franchise_id != (current_user.franchise_id or ""):
-        raise HTTPException(status_code=403, detail="Not allowed to delete this property")
-
-    await database.properties.delete_one({"id": property_id})
+    await record_property_deleted(database, prop.model_dump())
+    await after_property_write(database, property_id, None, before=prop.model_dump())
     return {"success": True}
 
 
@@ -377,18 +703,35 @@ async def create_lead(
         franchise_id=prop.franchise_id,
     )
     await database.leads.insert_one(lead.model_dump())
+    await record_lead_created(database, lead.model_dump())
     return LeadPublic(**lead.model_dump())
 
 
 @api_router.post("/leads/booking/create-order", response_model=RazorpayOrderResponse)
 async def create_booking_order(
     payload: RazorpayOrderRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     current_user: UserInDB = Depends(get_current_active_user),
     database: AsyncIOMotorDatabase = Depends(get_db),
 ):
     if current_user.role != "customer":
         raise HTTPException(status_code=403, detail="Only customers can create bookings")
 
+    async def create() -> dict:
+        order = await _create_booking_order(payload, current_user, database)
+        return order.model_dump()
+
+    if idempotency_key is None:
+        return await _create_booking_order(payload, current_user, database)
+    stored = await run_idempotent(
+        database, f"booking-order:{current_user.id}", idempotency_key, payload.model_dump(), create
+    )
+    return RazorpayOrderResponse(**stored)
+
+
+async def _create_booking_order(
+    payload: RazorpayOrderRequest, current_user: UserInDB, database: AsyncIOMotorDatabase
+) -> RazorpayOrderResponse:
     prop_doc = await database.properties.find_one({"id": payload.property_id})
     if not prop_doc:
         raise HTTPException(status_code=404, detail="Property not found")
@@ -397,7 +740,7 @@ async def create_booking_order(
 
     razorpay_service = get_razorpay_service()
     receipt_id = f"lead-booking-{current_user.id}-{int(datetime.now(timezone.utc).timestamp())}"
-    order = razorpay_service.create_order(
+    order = await razorpay_service.create_order(
         amount=payload.amount,
         receipt=receipt_id,
         notes={"property_id": prop.id, "customer_id": current_user.id},
@@ -414,14 +757,13 @@ async def create_booking_order(
         razorpay_order_id=order["id"],
     )
     await database.leads.insert_one(lead.model_dump())
-
-    razorpay_key_public = os.environ.get("RAZORPAY_KEY_ID", "")
+    await record_lead_created(database, lead.model_dump())
 
     return RazorpayOrderResponse(
         order_id=order["id"],
         amount=payload.amount,
         currency=order["currency"],
-        razorpay_key=razorpay_key_public,
+        razorpay_key=razorpay_service.key_id,
         lead_id=lead.id,
     )
 
@@ -435,21 +777,14 @@ async def verify_booking_payment(
     if current_user.role != "customer":
         raise HTTPException(status_code=403, detail="Only customers can verify bookings")
 
-    lead_doc = await database.leads.find_one({"id": payload.lead_id})
-    if not lead_doc:
-        raise HTTPException(status_code=404, detail="Lead not found")
-
-    lead = LeadInDB(**lead_doc)
-    if lead.customer_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not allowed to verify this lead")
-
+    # Signature verification is a local HMAC check, so it can run before touching the lead
     razorpay_service = get_razorpay_service()
     razorpay_service.verify_signature(
         payload.razorpay_order_id, payload.razorpay_payment_id, payload.razorpay_signature
     )
 
-    await database.leads.update_one(
-        {"id": lead.id},
+    lead_doc = await database.leads.find_one_and_update(
+        {"id": payload.lead_id, "customer_id": current_user.id},
         {
             "$set": {
                 "status": "completed",
@@ -458,61 +793,96 @@ async def verify_booking_payment(
                 "updated_at": datetime.now(timezone.utc),
             }
         },
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
     )
+    if lead_doc is None:
+        await raise_not_found_or_forbidden(
+            database.leads, payload.lead_id, "Lead not found", "Not allowed to verify this lead"
+        )
+
+    # The pre-image is atomic, so only the first completion is counted
+    lead = LeadInDB(**lead_doc)
+    if lead.status != "completed":
+        await record_booking_completed(database, lead.model_dump())
 
     return {"success": True}
 
 
+@api_router.post("/webhooks/razorpay")
+async def razorpay_webhook(request: Request, database: AsyncIOMotorDatabase = Depends(get_db)):
+    """Acknowledge a signed Razorpay event; settlement happens in the background worker."""
+    body = await request.body()
+    verify_webhook_signature(body, request.headers.get("x-razorpay-signature", ""))
+    accepted = await get_webhook_processor().accept(database, body, request.headers.get("x-razorpay-event-id"))
+    return {"status": "accepted" if accepted else "duplicate"}
+
+
+# ---------- Exports ----------
+
+@api_router.get("/export/properties")
+async def export_properties(
+    format: ExportFormat = "ndjson",
+    gzip: bool = False,
+    fields: FieldSet = Depends(export_fields("properties")),
+    current_user: UserInDB = Depends(get_current_active_user),
+    database: AsyncIOMotorDatabase = Depends(get_db),
+):
+    query = export_scope(current_user, "properties")
+    return export_response(database, "properties", query, format, gzip, fields)
+
+
+@api_router.get("/export/leads")
+async def export_leads(
+    format: ExportFormat = "ndjson",
+    gzip: bool = False,
+    fields: FieldSet = Depends(export_fields("leads")),
+    current_user: UserInDB = Depends(get_current_active_user),
+    database: AsyncIOMotorDatabase = Depends(get_db),
+):
+    query = export_scope(current_user, "leads")
+    return export_response(database, "leads", query, format, gzip, fields)
+
+
 # ---------- Dashboards ----------
 
 @api_router.get("/dashboard/customer", response_model=DashboardCustomer)
 async def dashboard_customer(
+    fields: FieldSet = Depends(lead_fields),
     current_user: UserInDB = Depends(get_current_active_user),
     database: AsyncIOMotorDatabase = Depends(get_db),
 ):
     if current_user.role != "customer":
         raise HTTPException(status_code=403, detail="Only customers can access this dashboard")
 
-    cursor = database.leads.find({"customer_id": current_user.id}, {"_id": 0})
-    docs = await cursor.to_list(200)
-    leads = [LeadPublic(**doc) for doc in docs]
-
-    total_leads = len(leads)
-    completed_bookings = len([
-        lead for lead in leads if lead.type == "booking" and lead.status == "completed"
-    ])
-
-    return DashboardCustomer(total_leads=total_leads, completed_bookings=completed_bookings, leads=leads)
+    counters, docs = await read_flight.do(
+        ("dashboard_customer", current_user.id, fields),
+        lambda: aggregate_customer_dashboard(database, current_user.id, lead_projection=projection(fields)),
+    )
+    data = {**counters, "leads": docs}
+    return FastJSONResponse(dump_sparse_items(DashboardCustomer, data, "leads", LeadPublic, fields))
 
 
 @api_router.get("/dashboard/agent", response_model=DashboardAgent)
 async def dashboard_agent(
+    fields: FieldSet = Depends(lead_fields),
     current_user: UserInDB = Depends(get_current_active_user),
     database: AsyncIOMotorDatabase = Depends(get_db),
 ):
     if current_user.role != "agent":
         raise HTTPException(status_code=403, detail="Only agents can access this dashboard")
 
-    leads_cursor = database.leads.find({"assigned_agent_id": current_user.id}, {"_id": 0})
-    leads_docs = await leads_cursor.to_list(200)
-    leads = [LeadPublic(**doc) for doc in leads_docs]
-
-    props_count = await database.properties.count_documents({"assigned_agent_id": current_user.id})
-    total_leads = len(leads)
-    completed_bookings = len([
-        lead for lead in leads if lead.type == "booking" and lead.status == "completed"
-    ])
-
-    return DashboardAgent(
-        total_leads=total_leads,
-        completed_bookings=completed_bookings,
-        properties_count=props_count,
-        leads=leads,
+    counters, leads_docs = await read_flight.do(
+        ("dashboard_agent", current_user.id, fields),
+        lambda: agent_dashboard(database, current_user.id, lead_projection=projection(fields)),
     )
+    data = {**counters, "leads": leads_docs}
+    return FastJSONResponse(dump_sparse_items(DashboardAgent, data, "leads", LeadPublic, fields))
 
 
 @api_router.get("/dashboard/franchise", response_model=DashboardFranchise)
 async def dashboard_franchise(
+    fields: FieldSet = Depends(lead_fields),
     current_user: UserInDB = Depends(get_current_active_user),
     database: AsyncIOMotorDatabase = Depends(get_db),
 ):
@@ -523,37 +893,12 @@ async def dashboard_franchise(
         raise HTTPException(status_code=400, detail="User not linked to a franchise")
 
     fid = current_user.franchise_id
-
-    props_cursor = database.properties.find({"franchise_id": fid}, {"_id": 0})
-    props_docs = await props_cursor.to_list(500)
-
-    total_properties = len(props_docs)
-    available_properties = len([p for p in props_docs if p.get("status") == "available"])
-    booked_properties = len([p for p in props_docs if p.get("status") == "booked"])
-    sold_properties = len([p for p in props_docs if p.get("status") == "sold"])
-
-    leads_cursor = database.leads.find({"franchise_id": fid}, {"_id": 0}).sort("created_at", -1)
-    leads_docs = await leads_cursor.to_list(200)
-    leads = [LeadPublic(**doc) for doc in leads_docs]
-
-    total_booking_amount = float(
-        sum(
-            (lead_doc.get("amount") or 0)
-            for lead_doc in leads_docs
-            if lead_doc.get("type") == "booking" and lead_doc.get("status") == "completed"
-        )
-    )
-
-    recent_leads = leads[:10]
-
-    return DashboardFranchise(
-        total_properties=total_properties,
-        available_properties=available_properties,
-        booked_properties=booked_properties,
-        sold_properties=sold_properties,
-        total_booking_amount=total_booking_amount,
-        recent_leads=recent_leads,
+    counters, recent_docs = await read_flight.do(
+        ("dashboard_franchise", fid, fields),
+        lambda: franchise_dashboard(database, fid, lead_projection=projection(fields)),
     )
+    data = {**counters, "recent_leads": recent_docs}
+    return FastJSONResponse(dump_sparse_items(DashboardFranchise, data, "recent_leads", LeadPublic, fields))
 
 
 # Include the router in the main app
@@ -565,15 +910,22 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "ETag", "Last-Modified"],
 )
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus scrape endpoint; requires ``Authorization: Bearer $METRICS_TOKEN`` when that is set."""
+    token = os.environ.get("METRICS_TOKEN")
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4")
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    await close_db_client()
\ No newline at end of file
+logger = logging.getLogger(__name__)
\ No newline at end of file
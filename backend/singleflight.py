@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent identical reads onto one in-flight call.
+
+    Keys are tuples whose first element names the query kind (used for the
+    per-kind counters). The shared call runs as its own task, so a caller
+    that disconnects does not cancel it for the others. Results are shared
+    between callers and must be treated as read-only.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self._coalesced_by_kind: dict[str, int] = defaultdict(int)
+
+    async def do(self, key: tuple, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+            self._coalesced_by_kind[str(key[0])] += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_by_kind": dict(self._coalesced_by_kind),
+        }
+
+
+read_flight = SingleFlight()
@@ -0,0 +1,302 @@
+"""Slow MongoDB operation detector with sampled explain plans.
+
+``SlowQueryMonitor`` is a pymongo command listener registered on the client
+in db.py. Any find/aggregate/count/distinct/update/delete/findAndModify
+that takes longer than ``SLOW_QUERY_MS`` is recorded under its query shape:
+the collection, the command and the filter with every value replaced by
+``"?"``, so ``{"city": {"$regex": "pune"}}`` and ``{"city": {"$regex": "goa"}}``
+are counted together.
+
+At most once per ``SLOW_QUERY_EXPLAIN_INTERVAL`` seconds per shape, and then
+only for a ``SLOW_QUERY_EXPLAIN_SAMPLE_RATE`` fraction of slow runs, the
+command is queued for a background ``explain`` (``executionStats``
+verbosity). The shape is flagged when the winning plan contains a
+``COLLSCAN`` or examines more than ``SLOW_QUERY_EXAMINED_RATIO`` documents or
+keys per returned document. The aggregate report is served at
+``GET /api/super-admin/slow-queries``.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from pymongo import monitoring
+
+
+logger = logging.getLogger(__name__)
+
+# Commands whose filter can be shaped and explained, mapped to a getter for that filter
+_FILTERS = {
+    "find": lambda cmd: cmd.get("filter"),
+    "count": lambda cmd: cmd.get("query"),
+    "distinct": lambda cmd: cmd.get("query"),
+    "findAndModify": lambda cmd: cmd.get("query"),
+    "aggregate": lambda cmd: next(
+        (stage["$match"] for stage in cmd.get("pipeline", []) if "$match" in stage), None
+    ),
+    "update": lambda cmd: (cmd.get("updates") or [{}])[0].get("q"),
+    "delete": lambda cmd: (cmd.get("deletes") or [{}])[0].get("q"),
+}
+
+# Fields the driver adds to a command that ``explain`` rejects or that belong to the original session
+_DRIVER_FIELDS = {
+    "$db", "lsid", "$clusterTime", "txnNumber", "$readPreference", "readConcern", "writeConcern",
+    "startTransaction", "autocommit", "apiVersion", "apiStrict", "apiDeprecationErrors",
+}
+
+
+def query_shape(value: Any) -> Any:
+    """``value`` with operator and field names kept and every literal replaced by ``"?"``."""
+    if isinstance(value, dict):
+        return {key: query_shape(v) for key, v in value.items()}
+    if isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+        return [query_shape(v) for v in value]  # $and / $or / $nor branches
+    return "?"
+
+
+def _find_key(doc: Any, key: str) -> Optional[dict]:
+    """First nested dict stored under ``key``; aggregate explains bury it inside ``stages``."""
+    if isinstance(doc, dict):
+        if isinstance(doc.get(key), dict):
+            return doc[key]
+        values = doc.values()
+    elif isinstance(doc, list):
+        values = doc
+    else:
+        return None
+    for value in values:
+        found = _find_key(value, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _plan_stages(plan: Any) -> list[str]:
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan["stage"]] if "stage" in plan else []
+    for child in ("queryPlan", "inputStage", "outerStage", "innerStage"):
+        stages.extend(_plan_stages(plan.get(child)))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+@dataclass
+class ExplainSummary:
+    stages: list[str]
+    docs_examined: int
+    keys_examined: int
+    returned: int
+    flags: list[str]
+
+    @classmethod
+    def from_explain(cls, result: dict, examined_ratio: float) -> "ExplainSummary":
+        planner = _find_key(result, "queryPlanner") or {}
+        execution = _find_key(result, "executionStats") or {}
+        stages = _plan_stages(planner.get("winningPlan"))
+        docs = int(execution.get("totalDocsExamined", 0))
+        keys = int(execution.get("totalKeysExamined", 0))
+        returned = int(execution.get("nReturned", 0))
+        flags = []
+        if "COLLSCAN" in stages:
+            flags.append("COLLSCAN")
+        if max(docs, keys) / max(returned, 1) > examined_ratio:
+            flags.append("HIGH_EXAMINED_RATIO")
+        return cls(stages, docs, keys, returned, flags)
+
+
+@dataclass
+class _ShapeStats:
+    database: str
+    collection: str
+    command: str
+    shape: dict
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    failures: int = 0
+    last_seen: float = 0.0
+    last_explained: float = 0.0
+    explain: Optional[ExplainSummary] = None
+    explain_error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "collection": self.collection,
+            "command": self.command,
+            "shape": self.shape,
+            "count": self.count,
+            "failures": self.failures,
+            "avg_ms": round(self.total_ms / self.count, 2),
+            "max_ms": round(self.max_ms, 2),
+            "total_ms": round(self.total_ms, 2),
+            "last_seen": self.last_seen,
+            "flags": self.explain.flags if self.explain else [],
+            "explain": self.explain.__dict__ if self.explain else None,
+            "explain_error": self.explain_error,
+        }
+
+
+@dataclass
+class _Pending:
+    database: str
+    command: dict = field(repr=False)
+
+
+class SlowQueryMonitor(monitoring.CommandListener):
+    def __init__(
+        self,
+        threshold_ms: float = 100,
+        sample_rate: float = 0.1,
+        explain_interval: float = 300,
+        examined_ratio: float = 100,
+        max_shapes: int = 500,
+    ) -> None:
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.explain_interval = explain_interval
+        self.examined_ratio = examined_ratio
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._pending: dict[tuple, _Pending] = {}
+        self._shapes: dict[str, _ShapeStats] = {}
+        self._dropped_shapes = 0
+        self._explains = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    # pymongo calls these from driver threads
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if self.enabled and event.command_name in _FILTERS:
+            with self._lock:
+                self._pending[(event.request_id, event.connection_id)] = _Pending(event.database_name, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool) -> None:
+        if not self.enabled or event.command_name not in _FILTERS:
+            return
+        with self._lock:
+            pending = self._pending.pop((event.request_id, event.connection_id), None)
+        duration_ms = event.duration_micros / 1000
+        if pending is not None and duration_ms >= self.threshold_ms:
+            self.record(pending.database, event.command_name, pending.command, duration_ms, failed)
+
+    def record(self, database: str, command_name: str, command: dict, duration_ms: float, failed: bool = False) -> None:
+        collection = command.get(command_name)
+        shape = {"filter": query_shape(_FILTERS[command_name](command) or {})}
+        if command_name == "find" and command.get("sort"):
+            shape["sort"] = dict(command["sort"])  # directions matter for index choice; keep them
+        key = json.dumps([database, collection, command_name, shape], sort_keys=True, default=str)
+        now = time.time()
+        with self._lock:
+            stats = self._shapes.get(key)
+            if stats is None:
+                if len(self._shapes) >= self.max_shapes:
+                    self._dropped_shapes += 1
+                    return
+                stats = self._shapes[key] = _ShapeStats(database, str(collection), command_name, shape)
+            stats.count += 1
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            stats.failures += failed
+            stats.last_seen = now
+            explain = (
+                not failed
+                and self._loop is not None
+                and now - stats.last_explained >= self.explain_interval
+                and random.random() < self.sample_rate
+            )
+            if explain:
+                stats.last_explained = now
+        if explain:
+            explain_cmd = {k: v for k, v in command.items() if k not in _DRIVER_FIELDS}
+            self._loop.call_soon_threadsafe(self._enqueue, key, database, explain_cmd)
+
+    def _enqueue(self, key: str, database: str, command: dict) -> None:
+        if not self._queue.full():
+            self._queue.put_nowait((key, database, command))
+
+    # Background explain worker
+
+    async def explain(self, client, key: str, database: str, command: dict) -> None:
+        try:
+            result = await client[database].command({"explain": command, "verbosity": "executionStats"})
+            summary, error = ExplainSummary.from_explain(result, self.examined_ratio), None
+        except Exception as exc:  # noqa: BLE001
+            summary, error = None, str(exc)
+        with self._lock:
+            stats = self._shapes.get(key)
+            if stats is not None:
+                stats.explain, stats.explain_error = summary, error
+            self._explains += 1
+        if stats is not None and summary is not None and summary.flags:
+            logger.warning(
+                "Slow %s on %s.%s %s: %s (plan %s)",
+                stats.command, database, stats.collection, json.dumps(stats.shape, default=str),
+                ", ".join(summary.flags), " <- ".join(summary.stages),
+            )
+
+    async def run(self, client) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=100)
+        try:
+            while True:
+                key, database, command = await self._queue.get()
+                await self.explain(client, key, database, command)
+        finally:
+            self._loop = None
+
+    def report(self, limit: int = 50) -> list[dict]:
+        """Slowest shapes first, ranked by total time spent."""
+        with self._lock:
+            shapes = sorted(self._shapes.values(), key=lambda s: s.total_ms, reverse=True)[:limit]
+            return [s.to_dict() for s in shapes]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+            self._dropped_shapes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold_ms,
+                "shapes": len(self._shapes),
+                "flagged_shapes": sum(1 for s in self._shapes.values() if s.explain and s.explain.flags),
+                "dropped_shapes": self._dropped_shapes,
+                "explains": self._explains,
+            }
+
+
+_slow_query_monitor: Optional[SlowQueryMonitor] = None
+
+
+def get_slow_query_monitor() -> SlowQueryMonitor:
+    global _slow_query_monitor
+    if _slow_query_monitor is None:
+        _slow_query_monitor = SlowQueryMonitor(
+            threshold_ms=float(os.environ.get("SLOW_QUERY_MS", 100)),
+            sample_rate=float(os.environ.get("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.1)),
+            explain_interval=float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", 300)),
+            examined_ratio=float(os.environ.get("SLOW_QUERY_EXAMINED_RATIO", 100)),
+            max_shapes=int(os.environ.get("SLOW_QUERY_MAX_SHAPES", 500)),
+        )
+    return _slow_query_monitor
@@ -0,0 +1,191 @@
+"""Razorpay webhook ingestion and batched booking settlement.
+
+``POST /api/webhooks/razorpay`` verifies the signature, records the event
+in ``webhook_events`` (``_id`` is the Razorpay event id, so redeliveries
+are dropped by the unique key) and returns at once. A background worker
+drains the queue and settles the matching booking leads with one
+``bulk_write`` per batch. Events still ``pending`` after a crash are
+re-queued when the worker starts.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from dashboard_stats import record_bookings_completed
+
+
+logger = logging.getLogger(__name__)
+
+# Events that mean the order has been paid
+SETTLING_EVENTS = {"payment.captured", "order.paid"}
+
+
+def verify_webhook_signature(body: bytes, signature: str) -> None:
+    secret = os.environ.get("RAZORPAY_WEBHOOK_SECRET")
+    if not secret:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Webhook secret not configured")
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, signature):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid webhook signature")
+
+
+def _payment_details(payload: dict) -> tuple[Optional[str], Optional[str]]:
+    payment = (payload.get("payment") or {}).get("entity") or {}
+    order = (payload.get("order") or {}).get("entity") or {}
+    return payment.get("order_id") or order.get("id"), payment.get("id")
+
+
+async def settle_paid_orders(database: AsyncIOMotorDatabase, paid: dict[str, tuple[Optional[str], str]]) -> list[dict]:
+    """Complete booking leads for ``{order_id: (payment_id, source)}`` in one ``bulk_write``.
+
+    Returns the leads this call completed and updates the dashboard counters for them.
+    """
+    if not paid:
+        return []
+    now = datetime.now(timezone.utc)
+    batch_id = uuid.uuid4().hex
+    await database.leads.bulk_write(
+        [
+            UpdateOne(
+                {"razorpay_order_id": order_id, "type": "booking", "status": {"$ne": "completed"}},
+                {
+                    "$set": {
+                        "status": "completed",
+                        "razorpay_payment_id": payment_id,
+                        "settled_by": source,
+                        "settlement_batch": batch_id,
+                        "updated_at": now,
+                    }
+                },
+            )
+            for order_id, (payment_id, source) in paid.items()
+        ],
+        ordered=False,
+    )
+    # The status guard means only leads this call actually completed carry its batch id,
+    # which keeps the dashboard counters exact when /leads/booking/verify or a retry raced us
+    settled = await database.leads.find(
+        {"razorpay_order_id": {"$in": list(paid)}, "settlement_batch": batch_id}, {"_id": 0}
+    ).to_list(None)
+    await record_bookings_completed(database, settled)
+    return settled
+
+
+class WebhookProcessor:
+    def __init__(self, batch_size: int = 100, max_wait_seconds: float = 0.05) -> None:
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._queue: asyncio.Queue[dict] = asyncio.Queue()
+        self.received = 0
+        self.duplicates = 0
+        self.ignored = 0
+        self.batches = 0
+        self.settled = 0
+        self.failed_batches = 0
+
+    async def accept(self, database: AsyncIOMotorDatabase, body: bytes, event_id: Optional[str]) -> bool:
+        """Record a verified event; False if this event id was already seen."""
+        try:
+            event = json.loads(body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail="Invalid webhook payload") from e
+
+        order_id, payment_id = _payment_details(event.get("payload") or {})
+        settles = event.get("event") in SETTLING_EVENTS and order_id is not None
+        doc = {
+            "_id": event_id or hashlib.sha256(body).hexdigest(),
+            "event": event.get("event"),
+            "order_id": order_id,
+            "payment_id": payment_id,
+            "status": "pending" if settles else "ignored",
+            "received_at": datetime.now(timezone.utc),
+        }
+        try:
+            await database.webhook_events.insert_one(doc)
+        except DuplicateKeyError:
+            self.duplicates += 1
+            return False
+
+        self.received += 1
+        if settles:
+            self._queue.put_nowait(doc)
+        else:
+            self.ignored += 1
+        return True
+
+    async def _next_batch(self) -> list[dict]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def settle(self, database: AsyncIOMotorDatabase, events: list[dict]) -> int:
+        """Complete the booking leads paid by ``events``; returns how many changed."""
+        paid: dict[str, tuple[Optional[str], str]] = {}
+        for event in events:
+            # payment.captured and order.paid both arrive for the same order; the first wins
+            paid.setdefault(event["order_id"], (event["payment_id"], event["_id"]))
+        settled = await settle_paid_orders(database, paid)
+        await database.webhook_events.update_many(
+            {"_id": {"$in": [e["_id"] for e in events]}},
+            {"$set": {"status": "processed", "processed_at": datetime.now(timezone.utc)}},
+        )
+        return len(settled)
+
+    async def run(self, database: AsyncIOMotorDatabase) -> None:
+        async for doc in database.webhook_events.find({"status": "pending"}):
+            self._queue.put_nowait(doc)
+        while True:
+            batch = await self._next_batch()
+            try:
+                self.settled += await self.settle(database, batch)
+                self.batches += 1
+            except Exception:  # noqa: BLE001
+                # Events stay pending in Mongo and are picked up again on restart
+                self.failed_batches += 1
+                logger.exception("Settling %d webhook event(s) failed", len(batch))
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "ignored": self.ignored,
+            "batches": self.batches,
+            "settled": self.settled,
+            "failed_batches": self.failed_batches,
+        }
+
+
+_webhook_processor: Optional[WebhookProcessor] = None
+
+
+def get_webhook_processor() -> WebhookProcessor:
+    global _webhook_processor
+    if _webhook_processor is None:
+        _webhook_processor = WebhookProcessor(
+            batch_size=int(os.environ.get("WEBHOOK_BATCH_SIZE", 100)),
+            max_wait_seconds=float(os.environ.get("WEBHOOK_BATCH_WAIT_SECONDS", 0.05)),
+        )
+    return _webhook_processor
@@ -0,0 +1,143 @@
+"""The trusted-read fast path must produce the same bytes as the ``response_model`` path."""
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter, ValidationError
+
+from fast_json import FastJSONResponse, trusted_dump, trusted_json, trusted_json_list
+from fieldsets import dump_sparse_items, sparse_model
+from models import (
+    AdminDashboardModel,
+    DashboardAgent,
+    DashboardCustomer,
+    DashboardFranchise,
+    LeadPublic,
+    PropertyBatchResult,
+    PropertyPublic,
+    SuperAdminDashboard,
+)
+
+
+def property_doc(**overrides):
+    # As stored: extra Mongo-only fields, price may be an int
+    doc = {
+        "id": "p1",
+        "title": "2BHK near the station",
+        "description": "Sunny",
+        "city": "Pune",
+        "city_key": "pune",
+        "price": 4500000,
+        "property_type": "2BHK",
+        "status": "available",
+        "franchise_id": "f1",
+        "assigned_agent_id": "a1",
+    }
+    doc.update(overrides)
+    return doc
+
+
+def lead_doc(**overrides):
+    doc = {
+        "id": "l1",
+        "property_id": "p1",
+        "type": "booking",
+        "customer_id": "c1",
+        "status": "completed",
+        "amount": 25000,
+    }
+    doc.update(overrides)
+    return doc
+
+
+def user_doc(**overrides):
+    doc = {"id": "u1", "email": "priya@example.com", "full_name": "Priya", "role": "agent", "password_hash": "x"}
+    doc.update(overrides)
+    return doc
+
+
+PROPERTY_VARIANTS = [
+    property_doc(),
+    property_doc(price=1e-7),
+    property_doc(price=1e20),
+    property_doc(price=0.1),
+    property_doc(price=123456789012345678.0),
+    property_doc(title="Flat in Pune – पुणे ✓", description='Quote " and \\ backslash\n'),
+    {k: v for k, v in property_doc().items() if k not in ("assigned_agent_id", "status")},
+]
+
+LEAD_VARIANTS = [
+    lead_doc(),
+    lead_doc(amount=1e-7),
+    lead_doc(message="Café visit ☕", razorpay_order_id="order_1"),
+    {k: v for k, v in lead_doc().items() if k != "amount"},
+]
+
+
+def old_body(model, doc):
+    return JSONResponse(jsonable_encoder(model(**doc))).body
+
+
+@pytest.mark.parametrize("doc", PROPERTY_VARIANTS)
+def test_property_public(doc):
+    assert trusted_json(PropertyPublic, doc) == old_body(PropertyPublic, doc)
+    assert FastJSONResponse(trusted_dump(PropertyPublic, doc)).body == old_body(PropertyPublic, doc)
+
+
+def test_property_list():
+    adapter = TypeAdapter(list[PropertyPublic])
+    old = JSONResponse(jsonable_encoder(adapter.validate_python(PROPERTY_VARIANTS))).body
+    assert trusted_json_list(PropertyPublic, PROPERTY_VARIANTS) == old
+
+
+@pytest.mark.parametrize("fields", [("id", "price"), ("id", "title", "assigned_agent_id")])
+@pytest.mark.parametrize("doc", PROPERTY_VARIANTS)
+def test_sparse_property(doc, fields):
+    model = sparse_model(PropertyPublic, fields)
+    assert trusted_json(model, doc) == old_body(model, doc)
+
+
+@pytest.mark.parametrize("doc", LEAD_VARIANTS)
+def test_lead_public(doc):
+    assert trusted_json(LeadPublic, doc) == old_body(LeadPublic, doc)
+
+
+@pytest.mark.parametrize("fields", [None, ("id", "price")])
+def test_property_batch(fields):
+    data = {"items": PROPERTY_VARIANTS, "missing": ["gone"]}
+    expected = {**data, "items": [sparse_model(PropertyPublic, fields)(**doc) for doc in PROPERTY_VARIANTS]}
+    old = JSONResponse(jsonable_encoder(expected)).body
+    fast = FastJSONResponse(dump_sparse_items(PropertyBatchResult, data, "items", PropertyPublic, fields)).body
+    assert fast == old
+
+
+@pytest.mark.parametrize(
+    "model, data",
+    [
+        (DashboardCustomer, {"total_leads": 3, "completed_bookings": 1, "leads": LEAD_VARIANTS}),
+        (DashboardAgent, {"total_leads": 3, "completed_bookings": 1, "properties_count": 2, "leads": LEAD_VARIANTS}),
+        (
+            DashboardFranchise,
+            {
+                "total_properties": 4,
+                "available_properties": 2,
+                "booked_properties": 1,
+                "sold_properties": 1,
+                "total_booking_amount": 25000,  # $sum of ints comes back as an int
+                "recent_leads": LEAD_VARIANTS,
+            },
+        ),
+        (SuperAdminDashboard, {"total_users": 2, "pending_users": [user_doc(), user_doc(id="u2", full_name="Zoë")]}),
+        (AdminDashboardModel, {"team_members": [user_doc(franchise_id="f1", is_verified=True)]}),
+    ],
+)
+def test_dashboards(model, data):
+    assert FastJSONResponse(trusted_dump(model, data)).body == old_body(model, data)
+
+
+def test_missing_required_field_raises_validation_error():
+    doc = property_doc()
+    del doc["franchise_id"]
+    with pytest.raises(ValidationError) as excinfo:
+        trusted_dump(PropertyPublic, doc)
+    assert excinfo.value.errors()[0]["type"] == "missing"
+    assert excinfo.value.errors()[0]["loc"] == ("franchise_id",)
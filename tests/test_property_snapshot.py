@@ -0,0 +1,96 @@
+"""Keyset paging over the in-memory listing snapshot across resyncs."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import property_snapshot
+from models import PropertyInDB
+from pagination import split_page
+from property_filters import PropertyFilter
+
+
+class FakeProperties:
+    """``properties`` collection stand-in that stores documents the way Mongo does."""
+
+    def __init__(self, on_row=None):
+        self.docs: dict[str, dict] = {}
+        self.on_row = on_row
+
+    def store(self, doc: dict) -> None:
+        created = doc["created_at"].astimezone(timezone.utc).replace(tzinfo=None)
+        self.docs[doc["id"]] = {**doc, "created_at": created.replace(microsecond=created.microsecond // 1000 * 1000)}
+
+    def find(self, query, projection):
+        async def rows():
+            for doc in list(self.docs.values()):
+                yield dict(doc)
+                if self.on_row:
+                    self.on_row()
+                await asyncio.sleep(0)
+
+        return rows()
+
+
+class FakeDatabase:
+    def __init__(self, properties: FakeProperties):
+        self.properties = properties
+
+
+@pytest.fixture(autouse=True)
+def snapshot_engine(monkeypatch):
+    monkeypatch.setenv("PROPERTY_LIST_ENGINE", "snapshot")
+    monkeypatch.setattr(property_snapshot, "_snapshot", None)
+
+
+def create(db: FakeDatabase, title: str, created_at: datetime) -> dict:
+    doc = PropertyInDB(
+        title=title, description="d", city="Pune", price=1, property_type="2BHK", franchise_id="f1", created_at=created_at
+    ).model_dump()
+    db.properties.store(doc)
+    property_snapshot.record_property_write(doc["id"], doc)
+    return doc
+
+
+def page(limit: int, cursor=None) -> tuple[list[str], str]:
+    docs = property_snapshot.get_property_snapshot().query(PropertyFilter(), limit, cursor)
+    docs, next_cursor = split_page(docs, limit)
+    return [d["title"] for d in docs], next_cursor
+
+
+def test_cursor_survives_resync():
+    db = FakeDatabase(FakeProperties())
+    asyncio.run(property_snapshot.resync_property_snapshot(db))
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for i in range(4):
+        # Sub-millisecond parts that Mongo would drop
+        create(db, f"t{i}", base + timedelta(seconds=i, microseconds=123456))
+
+    first, cursor = page(2)
+    assert first == ["t3", "t2"]
+
+    asyncio.run(property_snapshot.resync_property_snapshot(db))
+    second, _ = page(2, cursor)
+    assert second == ["t1", "t0"]
+
+
+def test_writes_during_resync_are_replayed():
+    properties = FakeProperties()
+    db = FakeDatabase(properties)
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for i in range(3):
+        create(db, f"t{i}", base + timedelta(seconds=i))
+    asyncio.run(property_snapshot.resync_property_snapshot(db))
+    first_id = next(iter(properties.docs))
+
+    def write_mid_load():
+        properties.on_row = None
+        create(db, "late", base + timedelta(seconds=10))
+        property_snapshot.record_property_write(first_id, None)
+        del properties.docs[first_id]
+
+    properties.on_row = write_mid_load
+    asyncio.run(property_snapshot.resync_property_snapshot(db))
+
+    titles, _ = page(10)
+    assert titles == ["late", "t2", "t1"]